@@ -0,0 +1,128 @@
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSIONS = "catalog_versions"
+AUDIO_CATALOG = "audio_tracks"
+
+# How often a worker re-reads the stored catalog version to notice another
+# worker's admin change; its own changes take effect immediately
+AUDIO_CATALOG_CHECK_INTERVAL = float(os.getenv("AUDIO_CATALOG_CHECK_INTERVAL", "30"))
+# Browsers and proxies may reuse the catalog this long without asking again
+AUDIO_CATALOG_MAX_AGE = int(os.getenv("AUDIO_CATALOG_MAX_AGE", "300"))
+AUDIO_CACHE_CONTROL = f"public, max-age={AUDIO_CATALOG_MAX_AGE}"
+
+# Deterministic ids, so every worker (and every start-up) seeds the same documents
+_TRACK_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "buddy-mind-flow/audio-tracks")
+
+DEFAULT_TRACKS = [
+    {
+        "title": "Ocean Waves",
+        "url": "https://assets.mixkit.co/active_storage/sfx/2393/2393-preview.mp3",
+        "category": "nature",
+        "duration": 180
+    },
+    {
+        "title": "Rain Sounds",
+        "url": "https://assets.mixkit.co/active_storage/sfx/2410/2410-preview.mp3",
+        "category": "nature",
+        "duration": 240
+    },
+    {
+        "title": "Forest Ambience",
+        "url": "https://assets.mixkit.co/active_storage/sfx/2459/2459-preview.mp3",
+        "category": "nature",
+        "duration": 200
+    },
+    {
+        "title": "Peaceful Piano",
+        "url": "https://assets.mixkit.co/active_storage/sfx/2458/2458-preview.mp3",
+        "category": "meditation",
+        "duration": 220
+    },
+    {
+        "title": "Calm Meditation",
+        "url": "https://assets.mixkit.co/active_storage/sfx/2457/2457-preview.mp3",
+        "category": "meditation",
+        "duration": 300
+    }
+]
+
+
+async def bump_catalog_version(db):
+    await db[CATALOG_VERSIONS].update_one({"_id": AUDIO_CATALOG}, {"$inc": {"version": 1}}, upsert=True)
+
+
+def default_track_id(url: str) -> str:
+    return str(uuid.uuid5(_TRACK_NAMESPACE, url))
+
+
+async def seed_audio_catalog(db) -> int:
+    """Insert the default tracks into an empty catalog; returns how many were added"""
+    if await db[AUDIO_CATALOG].count_documents({}, limit=1):
+        return 0
+    # Upserts keyed on deterministic ids: workers seeding at the same time converge
+    result = await db[AUDIO_CATALOG].bulk_write([
+        UpdateOne({"id": default_track_id(track["url"])},
+                  {"$setOnInsert": {"id": default_track_id(track["url"]), **track}},
+                  upsert=True)
+        for track in DEFAULT_TRACKS
+    ], ordered=False)
+    if result.upserted_count:
+        logger.info(f"Seeded audio catalog with {result.upserted_count} tracks")
+        await bump_catalog_version(db)
+    return result.upserted_count
+
+
+class AudioCatalog:
+    """
+    In-process copy of the audio track catalog, keyed by a stored version.
+
+    The version lives in the catalog_versions collection and is bumped on
+    every catalog change, so all workers agree on it and it can serve as the
+    catalog's ETag. The serialised response body is cached alongside it.
+    """
+
+    def __init__(self, check_interval: float = AUDIO_CATALOG_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self.version: Optional[int] = None
+        self.tracks: List[Dict] = []
+        self.body: bytes = b"[]"
+        self._checked_at = 0.0
+
+    @property
+    def etag(self) -> str:
+        return f'"audio-{self.version}"'
+
+    async def _stored_version(self, db) -> int:
+        doc = await db[CATALOG_VERSIONS].find_one({"_id": AUDIO_CATALOG})
+        return doc["version"] if doc else 0
+
+    async def load(self, db):
+        version = await self._stored_version(db)
+        if version != self.version:
+            self.tracks = await db[AUDIO_CATALOG].find({}, {"_id": 0}).sort("_id", 1).to_list(None)
+            self.body = json.dumps(self.tracks).encode()
+            self.version = version
+        self._checked_at = time.monotonic()
+
+    async def get(self, db) -> "AudioCatalog":
+        if self.version is None or time.monotonic() - self._checked_at >= self.check_interval:
+            await self.load(db)
+        return self
+
+    async def add_track(self, db, track: Dict):
+        """Store a new track, bump the version and reload this worker's copy"""
+        await db[AUDIO_CATALOG].insert_one(dict(track))
+        await bump_catalog_version(db)
+        await self.load(db)
+
+
+audio_catalog = AudioCatalog()
@@ -1,16 +1,39 @@
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from cache_utils import LRUCache
+from metrics import PASSWORD_HASH_DURATION, timed
+import asyncio
 import os
+import time
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing. Hashes made with a different cost factor are flagged for
+# rehashing, so changing BCRYPT_ROUNDS upgrades users as they log in.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# bcrypt releases the GIL, so a thread pool lets hashing use every core
+# without blocking the event loop
+PASSWORD_HASH_CONCURRENCY = int(os.getenv("PASSWORD_HASH_CONCURRENCY", str(os.cpu_count() or 1)))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "10"))
 
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "buddy-mind-flow-secret-key-2024")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
+# Decoded tokens are cached by signature so repeat requests skip JWT verification
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+token_cache = LRUCache(max_entries=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -20,6 +43,51 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
+def verify_and_update_password(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    """Verify a password and return a fresh hash if the stored one uses outdated settings"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when no hashing slot frees up within the queue timeout."""
+
+
+_hash_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_CONCURRENCY, thread_name_prefix="bcrypt")
+_hash_slots: Optional[asyncio.Semaphore] = None
+
+
+async def _run_hashing(operation: str, fn, *args):
+    global _hash_slots
+    if _hash_slots is None:
+        _hash_slots = asyncio.Semaphore(PASSWORD_HASH_CONCURRENCY)
+    with timed(PASSWORD_HASH_DURATION.labels(operation), "bcrypt"):
+        try:
+            await asyncio.wait_for(_hash_slots.acquire(), timeout=PASSWORD_HASH_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise PasswordHashingBusy("Password hashing queue is full") from None
+        try:
+            return await asyncio.get_running_loop().run_in_executor(_hash_pool, fn, *args)
+        finally:
+            _hash_slots.release()
+
+
+async def get_password_hash_async(password) -> str:
+    return await _run_hashing("hash", get_password_hash, password)
+
+
+async def verify_and_update_password_async(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    return await _run_hashing("verify", verify_and_update_password, plain_password, hashed_password)
+
+
+async def warm_up_password_hashing():
+    """Hash once off the request path, so passlib loads its bcrypt backend before the first sign-in"""
+    await asyncio.get_running_loop().run_in_executor(_hash_pool, get_password_hash, "warm-up")
+
+
+def shutdown_password_hashing():
+    _hash_pool.shutdown(wait=False, cancel_futures=True)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -37,3 +105,19 @@ def decode_token(token: str):
         return payload
     except JWTError:
         return None
+
+
+def decode_token_cached(token: str):
+    """decode_token with a short-lived cache keyed by the token's signature"""
+    signature = token.rsplit(".", 1)[-1]
+    cached = token_cache.get(signature)
+    if cached is not None and cached[0] == token:
+        return cached[1]
+
+    payload = decode_token(token)
+    if payload:
+        # Never keep a token in the cache past its own expiry
+        ttl = min(TOKEN_CACHE_TTL, payload.get("exp", 0) - time.time())
+        if ttl > 0:
+            token_cache.set(signature, (token, payload), ttl=ttl)
+    return payload
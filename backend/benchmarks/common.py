@@ -0,0 +1,90 @@
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+def percentile(ordered: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(p * len(ordered))) - 1))]
+
+
+def summarize(samples_ms: List[float], elapsed: Optional[float] = None) -> Dict:
+    """Count, mean and p50/p95/p99 of latencies in milliseconds, plus throughput if ``elapsed`` is given"""
+    ordered = sorted(samples_ms)
+    summary = {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 4) if ordered else 0.0,
+        "min_ms": round(ordered[0], 4) if ordered else 0.0,
+        "max_ms": round(ordered[-1], 4) if ordered else 0.0,
+    }
+    for p in PERCENTILES:
+        summary[f"p{int(p * 100)}_ms"] = round(percentile(ordered, p), 4)
+    if elapsed is not None:
+        summary["throughput_per_s"] = round(len(ordered) / elapsed, 2) if elapsed > 0 else 0.0
+    return summary
+
+
+def _current_rss_mb(pid: str = "self") -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return None
+
+
+def rss_mb() -> Dict:
+    """
+    Resident memory of this process, now and at its peak, and of its worker processes now.
+
+    Current figures come from /proc and are None on platforms without it.
+    """
+    current = _current_rss_mb()
+    workers = [_current_rss_mb(str(child.pid)) for child in multiprocessing.active_children()]
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 2 ** 20 if sys.platform == "darwin" else 2 ** 10
+    return {
+        "current": round(current, 1) if current is not None else None,
+        "peak": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "workers": round(sum(rss for rss in workers if rss is not None), 1),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment() -> Dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def emit(report: Dict, output: Optional[str]):
+    """Write ``report`` as JSON to ``output``, or to stdout when it is None or "-" """
+    text = json.dumps(report, indent=2, default=str)
+    if output and output != "-":
+        with open(output, "w") as f:
+            f.write(text + "\n")
+        print(f"Wrote {output}", file=sys.stderr)
+    else:
+        print(text)
@@ -0,0 +1,53 @@
+"""
+Compare two benchmark reports written by benchmarks.micro, benchmarks.load or benchmarks.scaling.
+
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+from typing import Dict
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "throughput_per_s")
+
+
+def _rows(report: Dict) -> Dict[str, Dict]:
+    if report.get("benchmark") == "load":
+        return {"total": report["total"], **report["operations"]}
+    if report.get("benchmark") == "scaling":
+        return {f"workers={row['workers']}": row for row in report["results"]}
+    return report["results"]
+
+
+def _change(before, after) -> str:
+    if not before or after is None:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    if before.get("benchmark") != after.get("benchmark"):
+        raise SystemExit("Reports come from different benchmarks")
+
+    before_rows, after_rows = _rows(before), _rows(after)
+    print(f"{'case':<22}{'metric':<18}{'before':>12}{'after':>12}{'change':>10}")
+    for name in before_rows:
+        if name not in after_rows:
+            continue
+        for metric in METRICS:
+            old, new = before_rows[name].get(metric), after_rows[name].get(metric)
+            if old is None:
+                continue
+            print(f"{name:<22}{metric:<18}{old:>12.3f}{new:>12.3f}{_change(old, new):>10}")
+
+
+if __name__ == "__main__":
+    main()
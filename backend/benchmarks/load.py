@@ -0,0 +1,255 @@
+"""
+End-to-end load harness for the API.
+
+Each virtual user registers, logs in and then issues a weighted mix of
+mood, journal, chat and dashboard requests until the run ends.
+
+    cd backend
+    python -m benchmarks.load --users 20 --duration 30 --output load.json
+
+By default the app runs in-process over ASGI against an in-memory Mongo
+stand-in (mongomock-motor) and a stub LLM, so no network or database is
+needed. ``--mongo-url`` uses a real mongod instead (a throwaway database is
+created and dropped), and ``--url`` sends the traffic to a server that is
+already running, e.g. one started with gunicorn.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import emit, environment, rss_mb, summarize
+
+DEFAULT_MIX = {
+    "mood_create": 3,
+    "moods_list": 2,
+    "journal_create": 2,
+    "journals_list": 2,
+    "chat": 1,
+    "dashboard": 3,
+}
+
+MOODS = ["happy", "calm", "sad", "anxious", "stressed", "peaceful"]
+NOTES = [
+    "Had a nice lunch with friends and laughed a lot.",
+    "Feeling nervous about the test tomorrow.",
+    "Tired after practice but proud of myself.",
+    "Nothing special happened today.",
+]
+JOURNALS = [
+    "Today I went to school and talked with my best friend about the weekend. I felt happy and calm.",
+    "I had an argument with my sister and I feel upset and a bit lonely tonight.",
+    "We went hiking with my family. The forest was peaceful and I want to go again soon.",
+]
+CHATS = [
+    "I feel worried about my exams.",
+    "I had a good day today!",
+    "Sometimes I feel like nobody listens to me.",
+]
+
+STUB_REPLY = "That sounds like a lot to carry. What helped you feel a little better last time?"
+STUB_LLM_URL = "http://llm.stub/v1"
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown operation {name!r}; choose from {', '.join(DEFAULT_MIX)}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+# ============= STAND-INS =============
+
+def stub_llm_transport(latency: float) -> httpx.MockTransport:
+    """OpenAI-compatible /chat/completions that answers with a canned reply after ``latency`` seconds"""
+
+    async def handle(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        if json.loads(request.content).get("stream"):
+            chunks = [
+                "data: " + json.dumps({"choices": [{"delta": {"content": word + " "}}]}) + "\n\n"
+                for word in STUB_REPLY.split()
+            ]
+            body = "".join(chunks) + "data: [DONE]\n\n"
+            return httpx.Response(200, content=body.encode(), headers={"content-type": "text/event-stream"})
+        return httpx.Response(200, json={"choices": [{"message": {"role": "assistant", "content": STUB_REPLY}}]})
+
+    return httpx.MockTransport(handle)
+
+
+def load_app(args):
+    """Import the server configured for the benchmark; returns it and the kind of database behind it"""
+    db_name = args.db_name or f"benchmark_{uuid.uuid4().hex[:8]}"
+    # Set before the import: the server reads them at import time and .env never overrides them
+    os.environ["MONGO_URL"] = args.mongo_url or "mongodb://stand-in.invalid:27017"
+    os.environ["DB_NAME"] = db_name
+    os.environ["LLM_BASE_URL"] = STUB_LLM_URL
+    os.environ.setdefault("TIMESTAMP_MIGRATION_ON_STARTUP", "false")
+    if args.sentiment_executor:
+        os.environ["SENTIMENT_EXECUTOR"] = args.sentiment_executor
+    if args.bcrypt_rounds:
+        os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+
+    import llm_client
+    import server
+
+    if not args.mongo_url:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise SystemExit("The in-memory stand-in needs mongomock-motor (pip install mongomock-motor), "
+                             "or pass --mongo-url for a real mongod")
+        server.client.close()
+        server.client = AsyncMongoMockClient()
+        server.db = server.client[db_name]
+
+    llm_client._client = httpx.AsyncClient(
+        base_url=STUB_LLM_URL, transport=stub_llm_transport(args.llm_latency_ms / 1000)
+    )
+    return server, "mongod" if args.mongo_url else "mongomock-motor"
+
+
+# ============= VIRTUAL USERS =============
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def call(self, name: str, request) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await request
+        except Exception:
+            self.errors[name] += 1
+            return None
+        self.samples[name].append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+
+async def virtual_user(index: int, http: httpx.AsyncClient, recorder: Recorder, mix: Dict[str, int],
+                       deadline: float, think: float, seed: int):
+    rng = random.Random(seed + index)
+    email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+    password = "benchmark-password"
+    await recorder.call("register", http.post("/api/auth/register", json={
+        "name": f"Bench User {index}", "email": email, "password": password, "age": 14,
+    }))
+    response = await recorder.call("login", http.post("/api/auth/login", json={"email": email, "password": password}))
+    if response is None or response.status_code != 200:
+        return
+    headers = {"Authorization": f"Bearer {response.json()['token']}"}
+
+    operations = {
+        "mood_create": lambda: http.post("/api/moods", headers=headers, json={
+            "mood": rng.choice(MOODS), "intensity": rng.randint(1, 10), "note": rng.choice(NOTES),
+        }),
+        "moods_list": lambda: http.get("/api/moods", headers=headers, params={"limit": 20}),
+        "journal_create": lambda: http.post("/api/journals", headers=headers, json={
+            "content": rng.choice(JOURNALS), "tags": ["school"],
+        }),
+        "journals_list": lambda: http.get("/api/journals", headers=headers, params={"limit": 20}),
+        "chat": lambda: http.post("/api/chat", headers=headers, json={"message": rng.choice(CHATS)}),
+        "dashboard": lambda: http.get("/api/dashboard/stats", headers=headers),
+    }
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        await recorder.call(name, operations[name]())
+        if think:
+            await asyncio.sleep(think)
+
+
+async def run(args) -> Dict:
+    mix = args.mix
+    server = None
+    if args.url:
+        target, database = args.url, "external"
+        http = httpx.AsyncClient(base_url=args.url, timeout=60)
+    else:
+        server, database = load_app(args)
+        await server.app.router.startup()
+        target = "in-process"
+        http = httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench", timeout=60)
+
+    recorder = Recorder()
+    rss_before = rss_mb()
+    try:
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*[
+            virtual_user(i, http, recorder, mix, deadline, args.think_ms / 1000, args.seed)
+            for i in range(args.users)
+        ])
+        elapsed = time.perf_counter() - started
+        rss_after = rss_mb()
+    finally:
+        await http.aclose()
+        if server is not None:
+            if args.mongo_url and not args.db_name:
+                await server.client.drop_database(os.environ["DB_NAME"])
+            await server.app.router.shutdown()
+
+    every = [sample for samples in recorder.samples.values() for sample in samples]
+    return {
+        "benchmark": "load",
+        "environment": environment(),
+        "config": {
+            "target": target,
+            "database": database,
+            "users": args.users,
+            "duration_s": args.duration,
+            "think_ms": args.think_ms,
+            "llm_latency_ms": args.llm_latency_ms,
+            "mix": mix,
+            "seed": args.seed,
+            "sentiment_executor": os.getenv("SENTIMENT_EXECUTOR", "process"),
+            "bcrypt_rounds": os.getenv("BCRYPT_ROUNDS", "12"),
+        },
+        "total": {**summarize(every, elapsed), "errors": sum(recorder.errors.values())},
+        "operations": {
+            name: {**summarize(samples, elapsed), "errors": recorder.errors.get(name, 0)}
+            for name, samples in sorted(recorder.samples.items())
+        },
+        "rss_mb": {"before": rss_before, "after": rss_after},
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of traffic after sign-in starts")
+    parser.add_argument("--think-ms", type=float, default=0, help="pause between a user's requests")
+    parser.add_argument("--mix", type=parse_mix, default=dict(DEFAULT_MIX), help=f"operation weights, e.g. chat=1,dashboard=3 (default {DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--llm-latency-ms", type=float, default=200, help="stub LLM reply delay")
+    parser.add_argument("--mongo-url", help="use this mongod instead of the in-memory stand-in")
+    parser.add_argument("--db-name", help="database to use (kept afterwards); default is a throwaway one")
+    parser.add_argument("--url", help="load an already running server at this base URL instead")
+    parser.add_argument("--sentiment-executor", choices=["process", "thread"])
+    parser.add_argument("--bcrypt-rounds", type=int)
+    parser.add_argument("--output", "-o", help="JSON file to write; stdout by default")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    emit(asyncio.run(run(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
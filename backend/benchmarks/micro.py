@@ -0,0 +1,99 @@
+"""
+Microbenchmarks for the CPU-bound helpers on the request path.
+
+    cd backend
+    python -m benchmarks.micro --output micro.json
+
+Each case runs a few warm-up calls, then ``--iterations`` timed calls
+(fewer for bcrypt, which is slow by design).
+"""
+import argparse
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.common import emit, environment, rss_mb, summarize
+
+TEXTS = [
+    "I feel happy and grateful after a calm walk with my friends today.",
+    "School was really stressful and I am worried about the exam tomorrow.",
+    "I'm so tired and sad, nothing went right and I feel alone.",
+    "Today was okay. We had pasta for dinner and watched a movie.",
+    "I was angry at my brother but we talked it out and now I feel better.",
+]
+
+
+def run_case(fn: Callable[[int], object], iterations: int, warmup: int) -> Dict:
+    for i in range(warmup):
+        fn(i)
+    samples: List[float] = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        call_started = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - call_started) * 1000)
+    return summarize(samples, time.perf_counter() - started)
+
+
+def build_cases(args) -> Dict[str, Dict]:
+    from auth_utils import (
+        BCRYPT_ROUNDS, create_access_token, decode_token, get_password_hash, verify_password
+    )
+    from sentiment_analyzer import analyze_sentiment, predict_emotion
+
+    password_hash = get_password_hash("correct horse battery staple")
+    tokens = [create_access_token({"user_id": f"user-{i}"}) for i in range(len(TEXTS))]
+
+    return {
+        "analyze_sentiment": {
+            "fn": lambda i: analyze_sentiment(TEXTS[i % len(TEXTS)]),
+            "iterations": args.iterations,
+        },
+        "predict_emotion": {
+            "fn": lambda i: predict_emotion(TEXTS[i % len(TEXTS)], 0.2),
+            "iterations": args.iterations,
+        },
+        "verify_password": {
+            "fn": lambda i: verify_password("correct horse battery staple", password_hash),
+            "iterations": args.bcrypt_iterations,
+            "params": {"bcrypt_rounds": BCRYPT_ROUNDS},
+        },
+        "create_access_token": {
+            "fn": lambda i: create_access_token({"user_id": f"user-{i}"}),
+            "iterations": args.iterations,
+        },
+        "decode_token": {
+            "fn": lambda i: decode_token(tokens[i % len(tokens)]),
+            "iterations": args.iterations,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--bcrypt-iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--only", action="append", help="run just this case (repeatable)")
+    parser.add_argument("--output", "-o", help="JSON file to write; stdout by default")
+    args = parser.parse_args()
+
+    cases = build_cases(args)
+    results = {}
+    for name, case in cases.items():
+        if args.only and name not in args.only:
+            continue
+        results[name] = {
+            **case.get("params", {}),
+            **run_case(case["fn"], case["iterations"], args.warmup),
+        }
+
+    emit({
+        "benchmark": "micro",
+        "environment": environment(),
+        "results": results,
+        "rss_mb": rss_mb(),
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
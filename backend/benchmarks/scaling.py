@@ -0,0 +1,128 @@
+"""
+Throughput of the production gunicorn setup as the number of workers grows.
+
+    cd backend
+    python -m benchmarks.scaling --mongo-url mongodb://localhost:27017 --workers 1,2,4,8 -o scaling.json
+
+For each worker count this starts gunicorn with gunicorn.conf.py against a
+throwaway database and waits for /api/health/ready. It then drives the
+server with the benchmarks.load mix over HTTP and stops it with SIGTERM.
+Chat is left out of the default mix, because the workers would call the
+real model; pass --llm-url (e.g. a local fake) to include it.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+import uuid
+from typing import Dict, List
+
+import httpx
+
+from benchmarks import load
+from benchmarks.common import emit, environment
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MIX = ",".join(f"{name}={weight}" for name, weight in load.DEFAULT_MIX.items() if name != "chat")
+
+
+def wait_ready(process: subprocess.Popen, url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"gunicorn exited with status {process.returncode} before becoming ready")
+        try:
+            if httpx.get(f"{url}/api/health/ready", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"gunicorn was not ready after {timeout}s")
+
+
+def run_with_workers(args, workers: int) -> Dict:
+    db_name = f"benchmark_scaling_{uuid.uuid4().hex[:8]}"
+    url = f"http://127.0.0.1:{args.port}"
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "PORT": str(args.port),
+        "MONGO_URL": args.mongo_url,
+        "DB_NAME": db_name,
+    }
+    if args.llm_url:
+        env["LLM_BASE_URL"] = args.llm_url
+    if args.bcrypt_rounds:
+        env["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+
+    output = None if args.verbose else subprocess.DEVNULL
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "server:app"],
+        cwd=BACKEND_DIR, env=env, stdout=output, stderr=output,
+    )
+    try:
+        wait_ready(process, url, args.ready_timeout)
+        load_args = load.build_parser().parse_args([
+            "--url", url,
+            "--users", str(args.users),
+            "--duration", str(args.duration),
+            "--mix", args.mix,
+            "--seed", str(args.seed),
+        ])
+        report = asyncio.run(load.run(load_args))
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        from pymongo import MongoClient
+
+        with MongoClient(args.mongo_url) as mongo:
+            mongo.drop_database(db_name)
+
+    return {"workers": workers, **report["total"], "operations": report["operations"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", required=True, help="mongod shared by every worker")
+    parser.add_argument("--workers", default="1,2,4,8", help="comma-separated worker counts to try")
+    parser.add_argument("--users", type=int, default=64, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--llm-url", help="OpenAI-compatible API for the workers to use")
+    parser.add_argument("--bcrypt-rounds", type=int)
+    parser.add_argument("--ready-timeout", type=float, default=120)
+    parser.add_argument("--verbose", action="store_true", help="show gunicorn's output")
+    parser.add_argument("--output", "-o", help="JSON file to write; stdout by default")
+    args = parser.parse_args()
+
+    results: List[Dict] = []
+    for workers in [int(count) for count in args.workers.split(",")]:
+        row = run_with_workers(args, workers)
+        baseline = results[0]["throughput_per_s"] if results else row["throughput_per_s"]
+        row["speedup"] = round(row["throughput_per_s"] / baseline, 2) if baseline else None
+        results.append(row)
+        print(f"{workers} workers: {row['throughput_per_s']} req/s, p99 {row['p99_ms']} ms", file=sys.stderr)
+
+    emit({
+        "benchmark": "scaling",
+        "environment": environment(),
+        "config": {
+            "users": args.users,
+            "duration_s": args.duration,
+            "mix": args.mix,
+            "bcrypt_rounds": args.bcrypt_rounds or os.getenv("BCRYPT_ROUNDS", "12"),
+        },
+        "results": results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from cache_utils import LRUCache
+from llm_client import LLMError
+from llm_gateway import llm_gateway
+from pagination import TIMELINE_SORT
+
+try:
+    import tiktoken
+except ImportError:  # optional: token counts fall back to an estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+CHAT_SUMMARIES = "chat_summaries"
+
+# Most recent turns considered for the prompt, before the token budget is applied
+CHAT_CONTEXT_TURNS = int(os.getenv("CHAT_CONTEXT_TURNS", "20"))
+# Tokens for the whole prompt: system prompt, summary, history and the new message
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "3000"))
+# Fold turns that fall out of the window into a stored rolling summary
+CHAT_SUMMARY_ENABLED = os.getenv("CHAT_SUMMARY_ENABLED", "false").lower() == "true"
+# Summarise once this many turns have fallen out of the window since the last summary
+CHAT_SUMMARY_BATCH = int(os.getenv("CHAT_SUMMARY_BATCH", "10"))
+CHAT_SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "300"))
+
+PROMPT_CACHE_SIZE = int(os.getenv("PROMPT_CACHE_SIZE", "10000"))
+
+THERAPIST_PROMPT = """You are a compassionate, professional AI therapist helping {name},
+a young person seeking mental health support. Your role is to:
+
+1. Listen empathetically and validate their feelings
+2. Ask thoughtful follow-up questions to understand their situation
+3. Provide gentle guidance and coping strategies
+4. Recognize signs of crisis and recommend professional help when needed
+5. Use age-appropriate language and maintain a warm, supportive tone
+6. Never judge or criticize
+7. Encourage healthy habits like exercise, sleep, and social connection
+8. Celebrate their strengths and progress
+
+Important: If the user expresses thoughts of self-harm or suicide, immediately encourage them to reach out to their emergency contacts or call a crisis helpline."""
+
+SUMMARY_PROMPT = """Update the running summary of a therapy conversation. Keep what matters for
+continuing to support the user: their situation, recurring feelings, coping strategies tried, and
+anything they asked to be remembered. Write at most {max_tokens} tokens of plain prose."""
+
+# Per-message framing tokens added by the chat completions format
+_MESSAGE_OVERHEAD = 4
+
+# The rendered system prompt only changes with the user's name
+prompt_cache = LRUCache(max_entries=PROMPT_CACHE_SIZE)
+
+_encoding = None
+_summary_tasks: Dict[str, asyncio.Task] = {}  # user_id -> running refresh
+
+
+def load_encoding():
+    """
+    Load the tiktoken encoding for LLM_MODEL; blocking, so run it in a thread at start-up.
+
+    The first load may download the BPE file. Until it has loaded, or if it
+    fails, count_tokens uses the estimate.
+    """
+    global _encoding
+    if tiktoken is None or _encoding is not None:
+        return
+    try:
+        encoding = tiktoken.encoding_for_model(os.getenv("LLM_MODEL", "gpt-4o"))
+    except KeyError:
+        encoding = tiktoken.get_encoding("cl100k_base")
+    _encoding = encoding
+
+
+def count_tokens(text: str) -> int:
+    """Token count with the tiktoken encoding once loaded, else a ~4 characters per token estimate"""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def _message_tokens(message: Dict) -> int:
+    return count_tokens(message["content"]) + _MESSAGE_OVERHEAD
+
+
+def system_prompt(user: Dict) -> str:
+    key = (user["id"], user["name"])
+    prompt = prompt_cache.get(key)
+    if prompt is None:
+        prompt = THERAPIST_PROMPT.format(name=user["name"])
+        prompt_cache.set(key, prompt)
+    return prompt
+
+
+async def recent_turns(db, user_id: str, limit: int = CHAT_CONTEXT_TURNS) -> List[Dict]:
+    """The user's latest chat turns, newest first, read from the user_timestamp_id index"""
+    return await db.chat_history.find(
+        {"user_id": user_id}, {"_id": 0, "id": 1, "message": 1, "response": 1, "timestamp": 1}
+    ).sort(TIMELINE_SORT).limit(limit).to_list(limit)
+
+
+async def build_chat_messages(
+    db,
+    user: Dict,
+    text: str,
+    sentiment: Dict,
+    supportive_msg: str,
+    budget: int = CHAT_CONTEXT_TOKEN_BUDGET,
+) -> List[Dict]:
+    """
+    Assemble the prompt for a new message in chat completions format.
+
+    The system prompt comes first and is identical on every call for a user,
+    so providers can cache it. The rolling summary (if any) and this message's
+    sentiment follow, then as many of the latest turns as fit in ``budget``
+    tokens, oldest first, then the new message.
+    """
+    summary = None
+    if CHAT_SUMMARY_ENABLED:
+        turns, summary_doc = await asyncio.gather(
+            recent_turns(db, user["id"]),
+            db[CHAT_SUMMARIES].find_one({"user_id": user["id"]}, {"_id": 0, "summary": 1}),
+        )
+        summary = summary_doc["summary"] if summary_doc else None
+    else:
+        turns = await recent_turns(db, user["id"])
+
+    context = f"Current sentiment analysis: {sentiment['sentiment']} (emotion: {sentiment['emotion']})\n{supportive_msg}"
+    if summary:
+        context = f"Summary of the earlier conversation: {summary}\n\n{context}"
+    head = [
+        {"role": "system", "content": system_prompt(user)},
+        {"role": "system", "content": context},
+    ]
+    tail = [{"role": "user", "content": text}]
+
+    remaining = budget - sum(_message_tokens(m) for m in head + tail)
+    history: List[Dict] = []
+    for turn in turns:
+        pair = [
+            {"role": "user", "content": turn["message"]},
+            {"role": "assistant", "content": turn["response"]},
+        ]
+        cost = sum(_message_tokens(m) for m in pair)
+        if cost > remaining:
+            break
+        remaining -= cost
+        history[:0] = pair
+    return head + history + tail
+
+
+# ============= ROLLING SUMMARY =============
+
+def _turn_key(turn: Dict):
+    return (turn["timestamp"], turn["id"])
+
+
+async def refresh_summary(db, user_id: str) -> bool:
+    """
+    Fold turns that have left the context window into the user's stored summary.
+
+    Waits until CHAT_SUMMARY_BATCH such turns have built up so the model is
+    called once per batch, not once per message. Returns True if it updated
+    the summary.
+    """
+    window = CHAT_CONTEXT_TURNS + CHAT_SUMMARY_BATCH
+    turns, summary_doc = await asyncio.gather(
+        recent_turns(db, user_id, window),
+        db[CHAT_SUMMARIES].find_one({"user_id": user_id}, {"_id": 0}),
+    )
+    summary_doc = summary_doc or {}
+    through = summary_doc.get("through")
+    # Turns past the window, oldest first, that the summary does not cover yet
+    pending = [
+        turn for turn in reversed(turns[CHAT_CONTEXT_TURNS:])
+        if through is None or _turn_key(turn) > (through["timestamp"], through["id"])
+    ]
+    if len(pending) < CHAT_SUMMARY_BATCH:
+        return False
+
+    transcript = "\n".join(f"User: {turn['message']}\nTherapist: {turn['response']}" for turn in pending)
+    messages = [
+        {"role": "system", "content": SUMMARY_PROMPT.format(max_tokens=CHAT_SUMMARY_MAX_TOKENS)},
+        {"role": "user", "content": f"Summary so far: {summary_doc.get('summary') or '(none)'}\n\nNew turns:\n{transcript}"},
+    ]
+    summary = await llm_gateway.complete(user_id, messages, max_tokens=CHAT_SUMMARY_MAX_TOKENS)
+    last = pending[-1]
+    await db[CHAT_SUMMARIES].update_one(
+        {"user_id": user_id},
+        {"$set": {
+            "summary": summary,
+            "through": {"timestamp": last["timestamp"], "id": last["id"]},
+            "updated_at": datetime.now(timezone.utc),
+        }},
+        upsert=True,
+    )
+    return True
+
+
+async def _refresh_summary_logged(db, user_id: str):
+    try:
+        await refresh_summary(db, user_id)
+    except LLMError as e:
+        logger.warning(f"Chat summary for {user_id} postponed: {str(e)}")
+    except Exception as e:
+        logger.error(f"Chat summary for {user_id} failed: {str(e)}")
+
+
+def schedule_summary_refresh(db, user_id: str) -> Optional[asyncio.Task]:
+    """Refresh the rolling summary in the background after a new turn is stored"""
+    if not CHAT_SUMMARY_ENABLED or user_id in _summary_tasks:
+        return None
+    task = asyncio.create_task(_refresh_summary_logged(db, user_id))
+    # One refresh per user at a time; the reference also keeps the task from
+    # being garbage collected before it finishes
+    _summary_tasks[user_id] = task
+    task.add_done_callback(lambda _: _summary_tasks.pop(user_id, None))
+    return task
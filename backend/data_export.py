@@ -0,0 +1,75 @@
+import json
+import os
+import zlib
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict
+
+from pagination import TIMELINE_SORT
+
+# Documents fetched per round trip; with the chunk size below this bounds the
+# memory an export holds at once, however long the user's history is
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+# Bytes of NDJSON gathered before a chunk is handed to the response
+EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", str(64 * 1024)))
+
+# (record type, collection) in the order they appear in an export
+EXPORT_COLLECTIONS = [
+    ("mood", "mood_entries"),
+    ("journal", "journal_entries"),
+    ("chat", "chat_history"),
+    ("game_score", "game_scores"),
+]
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.isoformat()
+    return str(value)
+
+
+def _line(record_type: str, doc: Dict) -> bytes:
+    record = {"type": record_type, **doc}
+    return json.dumps(record, default=_json_default, separators=(",", ":")).encode() + b"\n"
+
+
+async def _ndjson_chunks(db, user: Dict) -> AsyncIterator[bytes]:
+    chunk = bytearray(_line("user", {
+        **user,
+        "exported_at": datetime.now(timezone.utc),
+    }))
+    for record_type, collection in EXPORT_COLLECTIONS:
+        cursor = db[collection].find(
+            {"user_id": user["id"]}, {"_id": 0}
+        ).sort(TIMELINE_SORT).batch_size(EXPORT_BATCH_SIZE)
+        async for doc in cursor:
+            chunk += _line(record_type, doc)
+            if len(chunk) >= EXPORT_CHUNK_BYTES:
+                yield bytes(chunk)
+                chunk = bytearray()
+    if chunk:
+        yield bytes(chunk)
+
+
+async def export_user_history(db, user: Dict, compress: bool = False) -> AsyncIterator[bytes]:
+    """
+    Stream a user's whole history as NDJSON, one record per line.
+
+    The first line is the user's profile; every other line is a stored entry
+    tagged with its ``type`` (mood, journal, chat or game_score), newest first
+    within each type. With ``compress`` the output is a gzip stream, compressed
+    incrementally as chunks are produced.
+    """
+    if not compress:
+        async for chunk in _ndjson_chunks(db, user):
+            yield chunk
+        return
+
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in _ndjson_chunks(db, user):
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
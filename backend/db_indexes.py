@@ -0,0 +1,177 @@
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Every per-user history collection is read as "this user's entries, newest first",
+# with the entry id breaking timestamp ties so keyset pages never skip or repeat rows
+_USER_TIMELINE = [("user_id", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)]
+# Entry ids double as idempotency keys for batch ingest, scoped to their owner
+_USER_ENTRY = [("user_id", ASCENDING), ("id", ASCENDING)]
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+    "mood_entries": [
+        IndexModel(_USER_TIMELINE, name="user_timestamp_id"),
+        IndexModel(_USER_ENTRY, name="user_entry_id_unique", unique=True),
+    ],
+    "journal_entries": [
+        IndexModel(_USER_TIMELINE, name="user_timestamp_id"),
+        IndexModel(_USER_ENTRY, name="user_entry_id_unique", unique=True),
+    ],
+    "chat_history": [
+        IndexModel(_USER_TIMELINE, name="user_timestamp_id"),
+    ],
+    "game_scores": [
+        IndexModel(_USER_TIMELINE, name="user_timestamp_id"),
+        IndexModel(_USER_ENTRY, name="user_entry_id_unique", unique=True),
+        IndexModel(
+            [("user_id", ASCENDING), ("game_type", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)],
+            name="user_game_timestamp_id",
+        ),
+    ],
+    "audio_tracks": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+    "user_stats": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "chat_summaries": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+}
+
+# Indexes made redundant by a wider replacement above, dropped once it is built
+RETIRED_INDEXES: Dict[str, List[str]] = {
+    "mood_entries": ["user_timestamp"],
+    "journal_entries": ["user_timestamp"],
+    "chat_history": ["user_timestamp"],
+    "game_scores": ["user_timestamp", "user_game_timestamp"],
+}
+
+# Hot queries that must be served from an index: (collection, filter, sort)
+HOT_QUERIES = [
+    ("users", {"email": "probe@example.com"}, None),
+    ("users", {"id": "probe"}, None),
+    ("mood_entries", {"user_id": "probe"}, {"timestamp": -1, "id": -1}),
+    ("journal_entries", {"user_id": "probe"}, {"timestamp": -1, "id": -1}),
+    ("chat_history", {"user_id": "probe"}, {"timestamp": -1, "id": -1}),
+    ("game_scores", {"user_id": "probe"}, {"timestamp": -1, "id": -1}),
+    ("game_scores", {"user_id": "probe", "game_type": "memory"}, {"timestamp": -1, "id": -1}),
+]
+
+# Plan stages that read an index; EXPRESS_IXSCAN and IDHACK are the fast paths for single-document lookups
+INDEX_STAGES = ("IXSCAN", "EXPRESS_IXSCAN", "IDHACK")
+
+
+async def ensure_indexes(db) -> Dict:
+    """
+    Create every declared index, one at a time so one failure does not block the rest.
+
+    createIndexes is a no-op for indexes that already exist with the same
+    definition, so this is safe to run on every start-up. Indexes listed in
+    RETIRED_INDEXES are dropped once their collection's new indexes are all
+    built. Returns a report of
+    the form {collection: {index_name: "ok" | "failed: <reason>"}}.
+    """
+    report: Dict[str, Dict[str, str]] = {}
+    for collection, models in INDEXES.items():
+        report[collection] = {}
+        for model in models:
+            name = model.document["name"]
+            try:
+                await db[collection].create_indexes([model])
+                report[collection][name] = "ok"
+            except PyMongoError as e:
+                # e.g. duplicate emails already stored make the unique index impossible
+                logger.error(f"Index {collection}.{name} could not be built: {str(e)}")
+                report[collection][name] = f"failed: {str(e)}"
+
+    for collection, names in RETIRED_INDEXES.items():
+        if any(result != "ok" for result in report.get(collection, {}).values()):
+            # Keep the old indexes serving reads until their replacement exists
+            continue
+        existing = await db[collection].index_information()
+        for name in names:
+            if name in existing:
+                try:
+                    await db[collection].drop_index(name)
+                    logger.info(f"Dropped retired index {collection}.{name}")
+                except PyMongoError as e:
+                    logger.error(f"Retired index {collection}.{name} could not be dropped: {str(e)}")
+    return report
+
+
+def _plan_stages(plan: Dict) -> List[str]:
+    # With the slot-based engine (MongoDB 7+) the stage tree sits under "queryPlan"
+    plan = plan.get("queryPlan", plan)
+    stages = []
+    while plan:
+        stages.append(plan.get("stage"))
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return stages
+
+
+async def explain_hot_queries(db) -> List[Dict]:
+    """Run queryPlanner explains for HOT_QUERIES and report whether each uses an index."""
+    results = []
+    for collection, query_filter, sort in HOT_QUERIES:
+        command = {"find": collection, "filter": query_filter}
+        if sort:
+            command["sort"] = sort
+        try:
+            explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+            stages = _plan_stages(explain["queryPlanner"]["winningPlan"])
+            results.append({
+                "collection": collection,
+                "filter": list(query_filter),
+                "stages": stages,
+                "uses_index": any(stage in INDEX_STAGES for stage in stages) and "COLLSCAN" not in stages,
+                "blocking_sort": "SORT" in stages,
+            })
+        except PyMongoError as e:
+            results.append({"collection": collection, "filter": list(query_filter), "error": str(e)})
+    return results
+
+
+class IndexManager:
+    """Builds indexes at start-up and keeps the latest build report"""
+
+    def __init__(self):
+        self.status = "pending"
+        self.report: Dict = {}
+        self.plans: List[Dict] = []
+        self.finished_at: Optional[datetime] = None
+
+    async def run(self, db):
+        self.status = "building"
+        try:
+            self.report = await ensure_indexes(db)
+            self.plans = await explain_hot_queries(db)
+            failed = any(
+                result != "ok" for indexes in self.report.values() for result in indexes.values()
+            )
+            self.status = "degraded" if failed else "ready"
+        except Exception as e:
+            logger.error(f"Index bootstrap failed: {str(e)}")
+            self.status = f"failed: {str(e)}"
+        self.finished_at = datetime.now(timezone.utc)
+        logger.info(f"Index bootstrap finished with status {self.status}")
+
+    def summary(self) -> Dict:
+        return {
+            "status": self.status,
+            "indexes": self.report,
+            "query_plans": self.plans,
+            "finished_at": self.finished_at,
+        }
+
+
+index_manager = IndexManager()
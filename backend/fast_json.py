@@ -0,0 +1,61 @@
+from typing import Dict, List, Type
+
+import orjson
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Z for UTC and naive datetimes treated as UTC, matching how pydantic serialises our models
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONResponse(ORJSONResponse):
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+class ModelRows:
+    """
+    Shapes documents read from our own collections like ``model`` would, without validating them.
+
+    Every stored document was written from a model_dump() of the same model, so
+    re-validating it on the way out only costs time. ``projection`` fetches just
+    the model's fields; ``rows`` puts them in field order and fills defaults
+    for fields older documents may lack.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.fields = [
+            (name, None if field.is_required() or field.default_factory is not None else field.default)
+            for name, field in model.model_fields.items()
+        ]
+        self.projection = {"_id": 0, **{name: 1 for name, _ in self.fields}}
+
+    def rows(self, docs: List[Dict]) -> List[Dict]:
+        fields = self.fields
+        return [{name: doc.get(name, default) for name, default in fields} for doc in docs]
+
+    def response(self, docs: List[Dict], response: Response) -> FastJSONResponse:
+        """JSON response for ``docs``, keeping headers already set on the injected ``response``"""
+        return FastJSONResponse(self.rows(docs), headers=dict(response.headers))
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """
+    GZip large responses, except on paths that must not be buffered or are compressed already.
+
+    Starlette's GZip holds streamed chunks inside the compressor, which would
+    stall server-sent events until enough text builds up.
+    """
+
+    def __init__(self, app: ASGIApp, exclude_paths=(), **kwargs):
+        super().__init__(app, **kwargs)
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
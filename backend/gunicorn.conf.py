@@ -0,0 +1,73 @@
+"""
+Production serving: gunicorn supervising uvicorn workers that run server:app.
+
+    cd backend
+    gunicorn -c gunicorn.conf.py server:app
+
+The app is imported once in the master and the workers fork from it, so
+the sentiment lexicons loaded here are shared copy-on-write. Each worker
+then forks its sentiment process pool and opens its own Mongo connection pool.
+
+Signals to the master:
+    TERM / INT   graceful shutdown: workers stop accepting connections, finish
+                 in-flight requests and flush buffered writes, for up to
+                 GUNICORN_GRACEFUL_TIMEOUT seconds
+    HUP          re-reads this file and replaces the workers gracefully; with
+                 preloading the code itself is not re-imported, so deploy new
+                 code by restarting the master (or USR2, then TERM the old one)
+    TTIN / TTOU  one worker more / fewer
+"""
+import gc
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8001')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+# One worker per core by default; WEB_CONCURRENCY is the usual platform override
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+# A worker whose event loop stalls this long is killed and replaced
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+# Replace a worker after this many requests (plus up to the jitter) to bound memory growth; 0 never
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+accesslog = os.getenv("GUNICORN_ACCESS_LOG")  # "-" for stdout; off by default
+
+# Sentiment analysis stays in a process pool, so scoring a long journal never holds a
+# worker's GIL and stalls its event loop. Each worker forks its pool in post_fork,
+# before it has started any thread, and the pool processes share the preloaded
+# lexicon copy-on-write. One per worker by default, since the workers already take
+# every core; bcrypt gets each worker's share of the cores.
+# Set before the app is imported, which reads them at import time
+if preload_app:
+    os.environ.setdefault("SENTIMENT_START_METHOD", "fork")
+os.environ.setdefault("SENTIMENT_WORKERS", "1")
+os.environ.setdefault("PASSWORD_HASH_CONCURRENCY", str(max(1, multiprocessing.cpu_count() // max(1, workers))))
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before any worker is forked
+    if not preload_app:
+        return
+    from sentiment_analyzer import load_lexicons
+
+    load_lexicons()
+    # Keep the garbage collector from touching (and so copying) every preloaded object
+    gc.freeze()
+    server.log.info("Preloaded sentiment lexicons for the workers")
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    import server as app_module
+    from sentiment_executor import sentiment_executor
+
+    # Still single-threaded here, so forking the sentiment pool is safe; the app's
+    # startup hook then finds it running
+    sentiment_executor.start()
+    # The master's client never connected, but its pool and monitor state must not be shared
+    app_module.connect_database()
@@ -0,0 +1,39 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Response
+
+
+# Per-user responses: browsers may keep them but must revalidate before every reuse
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def weak_etag(*parts) -> str:
+    """Weak ETag derived from everything a response depends on"""
+    digest = hashlib.blake2b("\x1f".join(str(part) for part in parts).encode(), digest_size=12)
+    return f'W/"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    True if an If-None-Match header value matches ``etag``.
+
+    Uses the weak comparison RFC 9110 prescribes for If-None-Match, so
+    W/"x" and "x" match each other.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
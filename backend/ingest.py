@@ -0,0 +1,77 @@
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError
+
+# Most items accepted by one /batch request
+INGEST_BATCH_MAX = int(os.getenv("INGEST_BATCH_MAX", "500"))
+
+DUPLICATE_KEY = 11000
+
+
+def client_timestamp(value: Optional[datetime], now: datetime) -> datetime:
+    """When an offline item was recorded; naive times are UTC, future times are clamped to now"""
+    if value is None:
+        return now
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return min(value, now)
+
+
+async def insert_idempotent(collection, docs: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Insert a batch of documents keyed by client-supplied ``id`` values.
+
+    Relies on the unique (user_id, id) index: an id that is already stored,
+    or repeated within the batch, is reported as a duplicate instead of being
+    written twice, so clients can safely retry a batch. Uses one unordered
+    insert_many, so one bad document does not stop the rest.
+
+    Returns the documents actually written and one status per input document,
+    in input order: {"id", "status": "created" | "duplicate" | "error"[, "detail"]}.
+    """
+    results: List[Dict] = []
+    unique: List[Dict] = []
+    seen = set()
+    for doc in docs:
+        if doc["id"] in seen:
+            results.append({"id": doc["id"], "status": "duplicate"})
+            continue
+        seen.add(doc["id"])
+        results.append({"id": doc["id"], "status": "created"})
+        unique.append(doc)
+
+    failed: Dict[int, Dict] = {}
+    if unique:
+        try:
+            await collection.insert_many(unique, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failed[error["index"]] = error
+
+    # Map positions in ``unique`` back to the results of first occurrences
+    created: List[Dict] = []
+    positions = [i for i, result in enumerate(results) if result["status"] == "created"]
+    for index, (position, doc) in enumerate(zip(positions, unique)):
+        error = failed.get(index)
+        if error is None:
+            doc.pop("_id", None)
+            created.append(doc)
+        elif error.get("code") == DUPLICATE_KEY:
+            results[position]["status"] = "duplicate"
+        else:
+            results[position] = {"id": doc["id"], "status": "error", "detail": error.get("errmsg", "write failed")}
+    return created, results
+
+
+def batch_summary(results: List[Dict]) -> Dict:
+    counts = {"created": 0, "duplicate": 0, "error": 0}
+    for result in results:
+        counts[result["status"]] += 1
+    return {
+        "created": counts["created"],
+        "duplicates": counts["duplicate"],
+        "errors": counts["error"],
+        "results": results,
+    }
@@ -0,0 +1,93 @@
+import json
+import os
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+
+# Settings are read on first use rather than at import, because the server
+# loads its .env file after importing this module:
+#   LLM_BASE_URL         any OpenAI-compatible API (OpenAI, a proxy, or a local fake);
+#                        default OpenAI, but required when only EMERGENT_LLM_KEY is set
+#   LLM_API_KEY          falls back to EMERGENT_LLM_KEY
+#   LLM_MODEL            default gpt-4o
+#   LLM_CONNECT_TIMEOUT  seconds, default 5
+#   LLM_READ_TIMEOUT     longest wait for the next byte of a reply, not the whole reply
+
+
+class LLMError(Exception):
+    """Raised when the model API fails or returns something unusable."""
+
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        api_key = os.getenv("LLM_API_KEY") or os.getenv("EMERGENT_LLM_KEY")
+        base_url = os.getenv("LLM_BASE_URL")
+        if not base_url:
+            if not os.getenv("LLM_API_KEY") and os.getenv("EMERGENT_LLM_KEY"):
+                # An Emergent key is not an OpenAI key; never send it to OpenAI
+                raise LLMError("LLM_BASE_URL must be set when using EMERGENT_LLM_KEY")
+            base_url = "https://api.openai.com/v1"
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        _client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            headers=headers,
+            timeout=httpx.Timeout(
+                float(os.getenv("LLM_READ_TIMEOUT", "60")),
+                connect=float(os.getenv("LLM_CONNECT_TIMEOUT", "5")),
+            ),
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _payload(messages: List[Dict], stream: bool, **options) -> Dict:
+    model = options.pop("model", None) or os.getenv("LLM_MODEL", "gpt-4o")
+    return {"model": model, "messages": messages, "stream": stream, **options}
+
+
+async def complete(messages: List[Dict], **options) -> str:
+    """Return the model's full reply to a list of chat messages"""
+    try:
+        response = await get_client().post("/chat/completions", json=_payload(messages, False, **options))
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+    except (httpx.HTTPError, ValueError, KeyError, IndexError, TypeError) as e:
+        raise LLMError(f"{type(e).__name__}: {str(e)}") from e
+
+
+async def stream(messages: List[Dict], **options) -> AsyncIterator[str]:
+    """
+    Yield the model's reply as text deltas, as soon as each one arrives.
+
+    Closing the iterator early (e.g. because the caller's client went away)
+    closes the upstream request, so the model stops generating.
+    """
+    try:
+        async with get_client().stream(
+            "POST", "/chat/completions", json=_payload(messages, True, **options)
+        ) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    return
+                choices = json.loads(data).get("choices") or []
+                delta = (choices[0].get("delta") or {}).get("content") if choices else None
+                if delta:
+                    yield delta
+    except (httpx.HTTPError, ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+        raise LLMError(f"{type(e).__name__}: {str(e)}") from e
@@ -0,0 +1,301 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+import llm_client
+from llm_client import LLMError
+from metrics import LLM_REQUEST_DURATION, add_request_timing
+
+logger = logging.getLogger(__name__)
+
+# Concurrency: calls in flight across the worker, and per user
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_MAX_PER_USER = int(os.getenv("LLM_MAX_PER_USER", "2"))
+# Longest wait for a free slot before giving up and using the fallback reply
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "5"))
+# Deadlines: a whole non-streamed reply, the first streamed token, a whole stream
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "30"))
+LLM_FIRST_TOKEN_DEADLINE = float(os.getenv("LLM_FIRST_TOKEN_DEADLINE", "15"))
+LLM_STREAM_DEADLINE = float(os.getenv("LLM_STREAM_DEADLINE", "120"))
+# Circuit breaker: open when at least BREAKER_ERROR_RATE of the calls in the last
+# BREAKER_WINDOW seconds failed (given BREAKER_MIN_CALLS calls), for BREAKER_COOLDOWN seconds
+LLM_BREAKER_WINDOW = float(os.getenv("LLM_BREAKER_WINDOW", "30"))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "10"))
+LLM_BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+
+class LLMUnavailable(LLMError):
+    """Raised without calling the model: breaker open, no free slot, or deadline passed."""
+
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker over a sliding time window.
+
+    closed: calls go through. open: calls fail fast until the cooldown ends.
+    half-open: a single trial call decides whether to close or re-open.
+    """
+
+    def __init__(
+        self,
+        window: float = LLM_BREAKER_WINDOW,
+        min_calls: int = LLM_BREAKER_MIN_CALLS,
+        error_rate: float = LLM_BREAKER_ERROR_RATE,
+        cooldown: float = LLM_BREAKER_COOLDOWN,
+    ):
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self._outcomes: deque = deque()  # (monotonic time, ok)
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.cooldown:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    def abandon(self):
+        """The call was cancelled by our side; let another call be the trial"""
+        self._trial_running = False
+
+    def record(self, ok: bool):
+        now = time.monotonic()
+        if self._opened_at is not None:
+            # Outcome of the half-open trial (or of a call started before opening)
+            self._trial_running = False
+            if ok:
+                self._opened_at = None
+                self._outcomes.clear()
+            elif self.state != "open":
+                self._opened_at = now
+            return
+
+        self._outcomes.append((now, ok))
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+        failures = sum(1 for _, outcome in self._outcomes if not outcome)
+        if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.error_rate:
+            self._opened_at = now
+            self.times_opened += 1
+            logger.warning(f"LLM circuit breaker opened ({failures}/{len(self._outcomes)} calls failed)")
+
+
+class Timing:
+    """Count, mean, max and recent percentiles of a duration, in milliseconds"""
+
+    def __init__(self, recent: int = 1024):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent: deque = deque(maxlen=recent)
+
+    def observe(self, seconds: float):
+        ms = seconds * 1000
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+        self._recent.append(ms)
+
+    def stats(self) -> Dict:
+        recent = sorted(self._recent)
+
+        def percentile(p: float) -> float:
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))], 2) if recent else 0.0
+
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 2) if self.count else 0.0,
+            "p50_ms": percentile(0.5),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(self.max, 2),
+        }
+
+
+class LLMGateway:
+    """
+    The one way requests reach the model.
+
+    Bounds calls in flight globally and per user, applies deadlines, fails fast
+    while the circuit breaker is open, and keeps metrics on queue wait and
+    upstream latency. Every failure surfaces as LLMError, so callers only need
+    one fallback path.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_per_user: int = LLM_MAX_PER_USER,
+        queue_timeout: float = LLM_QUEUE_TIMEOUT,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_per_user = max(1, max_per_user)
+        self.queue_timeout = queue_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._user_slots: Dict[str, List] = {}  # user_id -> [semaphore, holders]
+        self.in_flight = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.rejected = 0
+        self.short_circuited = 0
+        self.queue_wait = Timing()
+        self.upstream_latency = Timing()
+        self.first_token_latency = Timing()
+
+    @asynccontextmanager
+    async def _slot(self, user_id: str):
+        if not self.breaker.allow():
+            self.short_circuited += 1
+            raise LLMUnavailable("LLM circuit breaker is open")
+        if self._slots is None:
+            # Created lazily so it binds to the running event loop
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+
+        entry = self._user_slots.setdefault(user_id, [asyncio.Semaphore(self.max_per_user), 0])
+        entry[1] += 1
+        started = time.monotonic()
+        try:
+            try:
+                await asyncio.wait_for(entry[0].acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise LLMUnavailable("Too many LLM calls in flight for this user") from None
+            try:
+                remaining = max(0.0, self.queue_timeout - (time.monotonic() - started))
+                try:
+                    await asyncio.wait_for(self._slots.acquire(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    self.rejected += 1
+                    raise LLMUnavailable("Too many LLM calls in flight") from None
+                self.queue_wait.observe(time.monotonic() - started)
+                self.in_flight += 1
+                try:
+                    yield
+                finally:
+                    self.in_flight -= 1
+                    self._slots.release()
+            finally:
+                entry[0].release()
+        finally:
+            # Frees the half-open trial if this call never reached the model
+            self.breaker.abandon()
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._user_slots.pop(user_id, None)
+
+    def _finish(self, mode: str, ok: Optional[bool], started: float):
+        elapsed = time.monotonic() - started
+        if ok is None:
+            # Cancelled by the caller (e.g. the client went away), which says
+            # nothing about upstream health
+            self.breaker.abandon()
+            LLM_REQUEST_DURATION.labels(mode, "cancelled").observe(elapsed)
+            return
+        self.breaker.record(ok)
+        self.upstream_latency.observe(elapsed)
+        LLM_REQUEST_DURATION.labels(mode, "ok" if ok else "error").observe(elapsed)
+        add_request_timing("llm", elapsed)
+        if ok:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+    async def complete(self, user_id: str, messages: List[Dict], deadline: float = LLM_DEADLINE, **options) -> str:
+        """Full reply from the model, or LLMError within ``deadline`` seconds"""
+        async with self._slot(user_id):
+            started = time.monotonic()
+            ok = None
+            try:
+                reply = await asyncio.wait_for(llm_client.complete(messages, **options), timeout=deadline)
+                ok = True
+                return reply
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                ok = False
+                raise LLMUnavailable(f"LLM reply took longer than {deadline}s") from None
+            except LLMError:
+                ok = False
+                raise
+            finally:
+                self._finish("complete", ok, started)
+
+    async def stream(
+        self,
+        user_id: str,
+        messages: List[Dict],
+        first_token_deadline: float = LLM_FIRST_TOKEN_DEADLINE,
+        deadline: float = LLM_STREAM_DEADLINE,
+        **options,
+    ) -> AsyncIterator[str]:
+        """Reply as text deltas; LLMError if the first token or the whole stream is too slow"""
+        async with self._slot(user_id):
+            started = time.monotonic()
+            tokens = llm_client.stream(messages, **options)
+            first = True
+            ok = None
+            try:
+                while True:
+                    limit = min(first_token_deadline, deadline) if first else deadline
+                    remaining = max(0.0, limit - (time.monotonic() - started))
+                    try:
+                        token = await asyncio.wait_for(tokens.__anext__(), timeout=remaining)
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        self.timed_out += 1
+                        ok = False
+                        stage = "First LLM token" if first else "LLM stream"
+                        raise LLMUnavailable(f"{stage} took longer than {limit}s") from None
+                    if first:
+                        self.first_token_latency.observe(time.monotonic() - started)
+                        first = False
+                    yield token
+                ok = True
+            except LLMError:
+                ok = False
+                raise
+            finally:
+                await tokens.aclose()
+                self._finish("stream", ok, started)
+
+    def stats(self) -> Dict:
+        return {
+            "breaker": self.breaker.state,
+            "breaker_opened": self.breaker.times_opened,
+            "max_concurrency": self.max_concurrency,
+            "max_per_user": self.max_per_user,
+            "in_flight": self.in_flight,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "rejected": self.rejected,
+            "short_circuited": self.short_circuited,
+            "queue_wait": self.queue_wait.stats(),
+            "upstream_latency": self.upstream_latency.stats(),
+            "first_token_latency": self.first_token_latency.stats(),
+        }
+
+
+llm_gateway = LLMGateway()
@@ -0,0 +1,392 @@
+import asyncio
+import bisect
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Adds a Server-Timing header (total, db, sentiment, bcrypt, llm) to every response;
+# meant for debugging, as it tells clients how the time was spent
+METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "false").lower() == "true"
+# How often the event loop lag probe wakes up
+EVENT_LOOP_LAG_INTERVAL = float(os.getenv("EVENT_LOOP_LAG_INTERVAL", "0.5"))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; from a cached query up to a slow model reply
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """
+    One metric family and its labelled series.
+
+    Mongo command events arrive on Motor's executor threads, so updates take
+    a lock; uncontended, that costs well under a microsecond.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.label_names:
+            # An unlabelled metric is reported (as zero) before its first update
+            self.labels()
+
+    def labels(self, *values):
+        key = tuple(str(value) for value in values)
+        series = self._series.get(key)
+        if series is None:
+            if len(key) != len(self.label_names):
+                raise ValueError(f"{self.name} takes labels {self.label_names}, got {key}")
+            with self._lock:
+                series = self._series.setdefault(key, self._new_series())
+        return series
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self, lock: threading.Lock):
+        self.value = 0.0
+        self._lock = lock
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_series(self):
+        return _Value(self._lock)
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}_total{_format_labels(self.label_names, key)} {_format_value(series.value)}"
+            for key, series in list(self._series.items())
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_series(self):
+        return _Value(self._lock)
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(series.value)}"
+            for key, series in list(self._series.items())
+        ]
+
+
+class _HistogramSeries:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...], lock: threading.Lock):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self._lock = lock
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labels)
+
+    def _new_series(self):
+        return _HistogramSeries(self.buckets, self._lock)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, series in list(self._series.items()):
+            with self._lock:
+                counts = list(series.counts)
+                total = series.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> bytes:
+        """Every metric in the Prometheus text exposition format"""
+        return ("\n".join(metric.render() for metric in self._metrics.values()) + "\n").encode()
+
+
+registry = Registry()
+
+HTTP_REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "Time to handle a request, until the response is complete",
+    ("method", "route", "status"),
+))
+HTTP_REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "Requests currently being handled",
+))
+MONGO_COMMAND_DURATION = registry.register(Histogram(
+    "mongo_command_duration_seconds", "MongoDB command round trips, as reported by the driver",
+    ("command", "collection", "outcome"),
+))
+SENTIMENT_DURATION = registry.register(Histogram(
+    "sentiment_analysis_duration_seconds", "Sentiment analysis including the wait for a worker; cache hits excluded",
+    ("kind",),
+))
+PASSWORD_HASH_DURATION = registry.register(Histogram(
+    "password_hash_duration_seconds", "bcrypt hashing and verification including the wait for a slot",
+    ("operation",),
+))
+LLM_REQUEST_DURATION = registry.register(Histogram(
+    "llm_request_duration_seconds", "Calls that reached the language model, until the reply ended",
+    ("mode", "outcome"),
+))
+LLM_FALLBACKS = registry.register(Counter(
+    "llm_fallbacks", "Chat replies that used the canned fallback instead of the model",
+    ("endpoint", "reason"),
+))
+EVENT_LOOP_LAG = registry.register(Histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a timer, sampled periodically",
+    buckets=LAG_BUCKETS,
+))
+
+
+# ============= PER-REQUEST TIMINGS =============
+
+# Milliseconds per phase for the current request, only set when Server-Timing is on.
+# Motor copies the context into its executor threads, so Mongo events see it too
+_request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def add_request_timing(phase: str, seconds: float):
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[phase] = timings.get(phase, 0.0) + seconds * 1000
+
+
+@contextmanager
+def timed(series, phase: Optional[str] = None):
+    """Observe how long the block took into a histogram series (and the request's Server-Timing)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        series.observe(elapsed)
+        if phase is not None:
+            add_request_timing(phase, elapsed)
+
+
+def server_timing_header(timings: Dict[str, float], total_ms: float) -> bytes:
+    parts = [f"{phase};dur={ms:.2f}" for phase, ms in timings.items()]
+    parts.append(f"total;dur={total_ms:.2f}")
+    return ", ".join(parts).encode("latin-1")
+
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request and counts those in flight.
+
+    Requests are labelled with the matched route's path template, so URLs
+    with ids in them share one series; unmatched paths share "unmatched".
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool = METRICS_SERVER_TIMING):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        timings = {} if self.server_timing else None
+        token = _request_timings.set(timings) if timings is not None else None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if timings is not None:
+                    total_ms = (time.perf_counter() - started) * 1000
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing_header(timings, total_ms)))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            if token is not None:
+                _request_timings.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.labels(scope["method"], route_path, status).observe(
+                time.perf_counter() - started
+            )
+
+
+# ============= MONGO COMMANDS =============
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    Records each command's driver-reported duration, labelled by collection.
+
+    Only the started event names the collection, so it is remembered by
+    request id until the command finishes.
+    """
+
+    def __init__(self):
+        self._collections: Dict[Tuple, str] = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if not isinstance(target, str):
+            # getMore names the collection separately; admin commands have none
+            target = event.command.get("collection", "none")
+        self._collections[(event.connection_id, event.request_id)] = target
+
+    def _finish(self, event, outcome: str):
+        collection = self._collections.pop((event.connection_id, event.request_id), "none")
+        seconds = event.duration_micros / 1_000_000
+        MONGO_COMMAND_DURATION.labels(event.command_name, collection, outcome).observe(seconds)
+        add_request_timing("db", seconds)
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+
+mongo_command_metrics = MongoCommandMetrics()
+
+
+# ============= EVENT LOOP LAG =============
+
+class EventLoopLagMonitor:
+    """Sleeps for ``interval`` in a loop and records how much later than asked it woke up"""
+
+    def __init__(self, interval: float = EVENT_LOOP_LAG_INTERVAL):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG.observe(max(0.0, loop.time() - expected))
+
+
+event_loop_lag_monitor = EventLoopLagMonitor()
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = "migrations"
+
+# (collection, field) pairs that used to be stored as ISO-8601 strings
+TIMESTAMP_FIELDS = [
+    ("mood_entries", "timestamp"),
+    ("journal_entries", "timestamp"),
+    ("game_scores", "timestamp"),
+    ("chat_history", "timestamp"),
+    ("users", "created_at"),
+]
+
+MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "500"))
+# Pause between batches so the migration never starves request traffic
+MIGRATION_BATCH_PAUSE = float(os.getenv("MIGRATION_BATCH_PAUSE", "0.05"))
+
+
+def parse_timestamp(value: str) -> Optional[datetime]:
+    """Parse a stored ISO-8601 string; naive values were always written in UTC"""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+async def migrate_timestamp_field(
+    db,
+    collection: str,
+    field: str,
+    batch_size: int = MIGRATION_BATCH_SIZE,
+    pause: float = MIGRATION_BATCH_PAUSE,
+) -> Dict:
+    """
+    Convert one string timestamp field to native BSON dates, in _id order.
+
+    Progress is checkpointed in the migrations collection after every batch,
+    so a restarted job resumes where it stopped. Each update is conditional on
+    the field still holding the original string, which makes concurrent runs
+    (e.g. several workers starting at once) harmless.
+    """
+    checkpoint_id = f"timestamps:{collection}.{field}"
+    # A finished run still resumes from its checkpoint, picking up any string
+    # timestamps written since (e.g. by old workers during a rolling deploy)
+    checkpoint = await db[MIGRATIONS].find_one({"_id": checkpoint_id}) or {}
+
+    last_id = checkpoint.get("last_id")
+    converted = checkpoint.get("converted", 0)
+    skipped = checkpoint.get("skipped", 0)
+
+    while True:
+        query = {field: {"$type": "string"}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await db[collection].find(query, {"_id": 1, field: 1}).sort("_id", 1).to_list(batch_size)
+        if not batch:
+            break
+
+        updates = []
+        for doc in batch:
+            parsed = parse_timestamp(doc[field])
+            if parsed is None:
+                skipped += 1
+                continue
+            updates.append(UpdateOne({"_id": doc["_id"], field: doc[field]}, {"$set": {field: parsed}}))
+        if updates:
+            result = await db[collection].bulk_write(updates, ordered=False)
+            converted += result.modified_count
+
+        last_id = batch[-1]["_id"]
+        await db[MIGRATIONS].update_one(
+            {"_id": checkpoint_id},
+            {"$set": {"last_id": last_id, "converted": converted, "skipped": skipped,
+                      "updated_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+        await asyncio.sleep(pause)
+
+    status = {"_id": checkpoint_id, "last_id": last_id, "converted": converted, "skipped": skipped,
+              "done": True, "updated_at": datetime.now(timezone.utc)}
+    await db[MIGRATIONS].replace_one({"_id": checkpoint_id}, status, upsert=True)
+    return status
+
+
+async def migrate_timestamps(db) -> Dict:
+    """Run the timestamp migration for every collection; returns per-field status"""
+    results = {}
+    for collection, field in TIMESTAMP_FIELDS:
+        status = await migrate_timestamp_field(db, collection, field)
+        results[f"{collection}.{field}"] = {
+            "converted": status.get("converted", 0),
+            "skipped": status.get("skipped", 0),
+            "done": status.get("done", False),
+        }
+        logger.info(f"Timestamp migration {collection}.{field}: {results[f'{collection}.{field}']}")
+    return results
+
+
+async def _main():
+    from pathlib import Path
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    try:
+        results = await migrate_timestamps(client[os.environ['DB_NAME']])
+        for name, status in results.items():
+            print(f"{name}: {status}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
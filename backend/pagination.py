@@ -0,0 +1,104 @@
+import base64
+import binascii
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import DESCENDING
+
+# History lists are read newest first, with the entry id breaking timestamp ties
+TIMELINE_SORT = [("timestamp", DESCENDING), ("id", DESCENDING)]
+
+# Largest page any history endpoint will return, whatever limit the client asks for
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "100"))
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor this server did not issue"""
+
+
+def page_size(limit: int) -> int:
+    return max(1, min(limit, PAGE_SIZE_MAX))
+
+
+def encode_cursor(doc: Dict) -> str:
+    """Opaque token pointing just past ``doc`` in TIMELINE_SORT order"""
+    timestamp = doc["timestamp"]
+    if isinstance(timestamp, datetime):
+        payload = {"t": timestamp.isoformat(), "k": "d", "i": doc["id"]}
+    else:
+        # Legacy ISO-string timestamp that the migration has not converted yet
+        payload = {"t": str(timestamp), "k": "s", "i": doc["id"]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[object, str]:
+    """Return the (timestamp, id) position encoded in a cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        kind, timestamp, entry_id = payload["k"], payload["t"], payload["i"]
+        if kind == "d":
+            timestamp = datetime.fromisoformat(timestamp)
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.replace(tzinfo=timezone.utc)
+        elif kind != "s":
+            raise ValueError(kind)
+        if not isinstance(entry_id, str) or not isinstance(timestamp, (str, datetime)):
+            raise ValueError(entry_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise InvalidCursor("Invalid or expired cursor") from None
+    return timestamp, entry_id
+
+
+def _after(cursor: str) -> Dict:
+    timestamp, entry_id = decode_cursor(cursor)
+    branches = [
+        {"timestamp": {"$lt": timestamp}},
+        {"timestamp": timestamp, "id": {"$lt": entry_id}},
+    ]
+    if isinstance(timestamp, datetime):
+        # BSON orders strings below dates, so descending order reaches any
+        # not-yet-migrated string timestamps after the last date; $lt on a date
+        # never matches a string, so they need their own branch
+        branches.append({"timestamp": {"$type": "string"}})
+    return {"$or": branches}
+
+
+async def fetch_page(
+    collection,
+    query: Dict,
+    limit: int,
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    projection: Optional[Dict] = None,
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Read one page of a user's timeline with keyset pagination.
+
+    Each page starts from the (timestamp, id) position in ``cursor`` instead of
+    skipping rows, so deep pages cost the same as the first one. ``since`` is
+    inclusive and ``until`` exclusive. Returns the page and the cursor for the
+    next one, or None when this was the last page.
+    """
+    limit = page_size(limit)
+    query = dict(query)
+    if since is not None or until is not None:
+        bounds = {}
+        if since is not None:
+            bounds["$gte"] = since
+        if until is not None:
+            bounds["$lt"] = until
+        query["timestamp"] = bounds
+    if cursor:
+        query.update(_after(cursor))
+
+    # One extra row tells whether there is a next page without a count query
+    docs = await collection.find(query, projection or {"_id": 0}).sort(TIMELINE_SORT).limit(limit + 1).to_list(limit + 1)
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(docs[-1])
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# A warm-up step that fails (e.g. Mongo is not reachable yet) is retried after
+# this delay, doubling up to the maximum, until it succeeds. Optional steps are
+# not retried: a failure marks them degraded and readiness does not wait for them
+WARMUP_RETRY_DELAY = float(os.getenv("WARMUP_RETRY_DELAY", "0.5"))
+WARMUP_RETRY_MAX_DELAY = float(os.getenv("WARMUP_RETRY_MAX_DELAY", "10"))
+
+
+class Readiness:
+    """
+    Start-up warm-up steps, and whether every one of them has finished.
+
+    Steps run concurrently in the background so the server binds its port
+    immediately; the first requests then no longer pay for loading lexicons,
+    the bcrypt backend or the first Mongo connection. ``ready`` turns true
+    once, when the last step succeeds (or, if optional, fails), and stays true.
+    """
+
+    def __init__(self, retry_delay: float = WARMUP_RETRY_DELAY, retry_max_delay: float = WARMUP_RETRY_MAX_DELAY):
+        self.retry_delay = retry_delay
+        self.retry_max_delay = retry_max_delay
+        self.created_at = time.perf_counter()
+        self.import_ms: Optional[float] = None
+        self._steps: Dict[str, Callable[[], Awaitable]] = {}
+        self._optional = set()
+        self._status: Dict[str, Dict] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._started_at: Optional[float] = None
+        self._ready_at: Optional[float] = None
+
+    def add_step(self, name: str, step: Callable[[], Awaitable], optional: bool = False):
+        self._steps[name] = step
+        if optional:
+            self._optional.add(name)
+        self._status[name] = {"status": "pending", "attempts": 0}
+
+    @property
+    def ready(self) -> bool:
+        return self._ready_at is not None
+
+    def start(self):
+        if self._tasks:
+            return
+        self._started_at = time.monotonic()
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._run(name, step)) for name, step in self._steps.items()]
+        if not self._tasks:
+            self._ready_at = self._started_at
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run(self, name: str, step: Callable[[], Awaitable]):
+        status = self._status[name]
+        delay = self.retry_delay
+        while True:
+            status["attempts"] += 1
+            started = time.monotonic()
+            try:
+                await step()
+                break
+            except Exception as e:
+                if name in self._optional:
+                    status["status"] = "degraded"
+                    status["error"] = str(e)
+                    logger.error(f"Warm-up step {name} failed, continuing without it: {str(e)}")
+                    self._check_ready()
+                    return
+                status["status"] = "retrying"
+                status["error"] = str(e)
+                logger.error(f"Warm-up step {name} failed (attempt {status['attempts']}): {str(e)}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.retry_max_delay)
+
+        status.pop("error", None)
+        status["status"] = "done"
+        status["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+        self._check_ready()
+
+    def _check_ready(self):
+        if all(step["status"] in ("done", "degraded") for step in self._status.values()):
+            self._ready_at = time.monotonic()
+            logger.info(f"Warm-up finished in {(self._ready_at - self._started_at) * 1000:.0f} ms, ready for traffic")
+
+    def summary(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "import_ms": self.import_ms,
+            "warm_up_ms": round((self._ready_at - self._started_at) * 1000, 1) if self.ready else None,
+            "degraded": [name for name, step in self._status.items() if step["status"] == "degraded"],
+            "steps": self._status,
+        }
+
+
+readiness = Readiness()
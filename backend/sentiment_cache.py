@@ -0,0 +1,76 @@
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+
+from cache_utils import LRUCache, SqliteCache
+
+SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "4096"))
+SENTIMENT_CACHE_MAX_BYTES = int(os.getenv("SENTIMENT_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+SENTIMENT_CACHE_TTL = float(os.getenv("SENTIMENT_CACHE_TTL", "86400"))
+# Only short texts (mood notes, chat lines) repeat often enough to be worth caching
+SENTIMENT_CACHE_MAX_TEXT = int(os.getenv("SENTIMENT_CACHE_MAX_TEXT", "1024"))
+# Optional SQLite file shared by all uvicorn workers on the host
+SENTIMENT_CACHE_PATH = os.getenv("SENTIMENT_CACHE_PATH")
+
+# Bumped whenever keys change meaning, so a shared cache file never serves results
+# stored under the old rules (v1 keys lowercased the text)
+KEY_VERSION = "v2:"
+
+
+def sentiment_cache_key(text: str) -> str:
+    """Content hash of the text with runs of whitespace collapsed.
+
+    TextBlob's tokenizer ignores how much whitespace separates words, so
+    that is safe to normalize. Case is kept: its emoticons are
+    case-sensitive (":D" is positive, ":d" is not).
+    """
+    normalized = " ".join(text.split())
+    return KEY_VERSION + hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class SentimentCache:
+    """In-process LRU of sentiment results with an optional shared on-disk tier"""
+
+    def __init__(
+        self,
+        max_entries: int = SENTIMENT_CACHE_SIZE,
+        max_bytes: int = SENTIMENT_CACHE_MAX_BYTES,
+        ttl: float = SENTIMENT_CACHE_TTL,
+        max_text: int = SENTIMENT_CACHE_MAX_TEXT,
+        shared_path: Optional[str] = SENTIMENT_CACHE_PATH,
+    ):
+        self.local = LRUCache(max_entries=max_entries, ttl=ttl, max_bytes=max_bytes)
+        self.shared = SqliteCache(shared_path, ttl=ttl) if shared_path else None
+        self.max_text = max_text
+        self.shared_hits = 0
+
+    def key_for(self, text: str) -> Optional[str]:
+        """Cache key for ``text``, or None when the text is too long to cache"""
+        if len(text) > self.max_text:
+            return None
+        return sentiment_cache_key(text)
+
+    def get(self, key: str) -> Optional[Dict]:
+        result = self.local.get(key)
+        if result is None and self.shared is not None:
+            raw = self.shared.get(key)
+            if raw is not None:
+                result = json.loads(raw)
+                self.shared_hits += 1
+                self.local.set(key, result)
+        return dict(result) if result is not None else None
+
+    def set(self, key: str, result: Dict):
+        self.local.set(key, dict(result))
+        if self.shared is not None:
+            self.shared.set(key, json.dumps(result))
+
+    def stats(self) -> Dict:
+        stats = self.local.stats()
+        stats["shared"] = self.shared is not None
+        stats["shared_hits"] = self.shared_hits
+        return stats
+
+
+sentiment_cache = SentimentCache()
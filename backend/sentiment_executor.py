@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from metrics import SENTIMENT_DURATION, timed
+from sentiment_analyzer import analyze_sentiment, analyze_sentiment_batch
+from sentiment_cache import sentiment_cache
+
+logger = logging.getLogger(__name__)
+
+# Worker tier configuration
+SENTIMENT_EXECUTOR = os.getenv("SENTIMENT_EXECUTOR", "process")  # process | thread
+SENTIMENT_WORKERS = int(os.getenv("SENTIMENT_WORKERS", str(min(2, os.cpu_count() or 1))))
+SENTIMENT_START_METHOD = os.getenv("SENTIMENT_START_METHOD", "spawn")
+SENTIMENT_MAX_PENDING = int(os.getenv("SENTIMENT_MAX_PENDING", "64"))
+SENTIMENT_QUEUE_TIMEOUT = float(os.getenv("SENTIMENT_QUEUE_TIMEOUT", "5"))
+
+
+class SentimentBackpressure(Exception):
+    """Raised when the sentiment queue is still full after the queue timeout."""
+
+
+def _warm_up():
+    # Runs once per worker so the TextBlob lexicon is loaded before real traffic
+    analyze_sentiment("Warming up the sentiment lexicon, feeling calm and happy.")
+    analyze_sentiment_batch(["Warming up the compiled lexicon."])
+
+
+def _init_process_worker():
+    # A forked worker inherits its parent's signal handlers (under gunicorn, the
+    # master's); restore the defaults so TERM and INT stop it like any process
+    for name in ("SIGTERM", "SIGINT", "SIGHUP", "SIGQUIT", "SIGUSR1", "SIGUSR2", "SIGTTIN", "SIGTTOU", "SIGWINCH"):
+        signal.signal(getattr(signal, name), signal.SIG_DFL)
+    _warm_up()
+
+
+class SentimentExecutor:
+    """Bounded worker pool that runs sentiment analysis off the event loop.
+
+    At most ``max_pending`` analyses may be queued or running at once; callers
+    beyond that wait up to ``queue_timeout`` seconds for a slot and then get
+    ``SentimentBackpressure``.
+    """
+
+    def __init__(
+        self,
+        kind: str = SENTIMENT_EXECUTOR,
+        workers: int = SENTIMENT_WORKERS,
+        max_pending: int = SENTIMENT_MAX_PENDING,
+        queue_timeout: float = SENTIMENT_QUEUE_TIMEOUT,
+        start_method: str = SENTIMENT_START_METHOD,
+    ):
+        if kind not in ("process", "thread"):
+            raise ValueError(f"Unknown sentiment executor kind: {kind}")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.queue_timeout = queue_timeout
+        self.start_method = start_method
+        self._pool: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._warming: List[Future] = []
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def started(self) -> bool:
+        return self._pool is not None
+
+    def start(self):
+        """
+        Create the pool and pre-warm every worker.
+
+        With the fork start method, call this while the process has no other
+        threads (gunicorn's post_fork); the pool forks all its workers before
+        starting its own management thread.
+        """
+        if self._pool is not None:
+            return
+        if self.kind == "process":
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=_init_process_worker,
+            )
+        else:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="sentiment",
+                initializer=_warm_up,
+            )
+        self._slots = asyncio.Semaphore(self.max_pending)
+        # Submitting one no-op per worker forces every worker (and its initializer) to start now
+        self._warming = [self._pool.submit(int) for _ in range(self.workers)]
+        logger.info(f"Sentiment executor started ({self.kind}, {self.workers} workers)")
+
+    async def wait_warm(self):
+        """Start the pool if needed and wait until every worker has run its warm-up."""
+        if self._pool is None:
+            self.start()
+        await asyncio.gather(*[asyncio.wrap_future(future) for future in self._warming])
+
+    def shutdown(self, wait: bool = True):
+        if self._pool is None:
+            return
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+        self._pool = None
+        self._slots = None
+
+    async def run(self, fn: Callable, *args):
+        """Run ``fn(*args)`` in the pool, waiting for a free slot if the queue is full."""
+        if self._pool is None:
+            self.start()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise SentimentBackpressure(
+                f"Sentiment queue full ({self.max_pending} pending)"
+            ) from None
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, fn, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+            self._slots.release()
+
+    def stats(self) -> Dict:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+sentiment_executor = SentimentExecutor()
+
+
+async def analyze_sentiment_async(text: str) -> Dict:
+    """Awaitable ``analyze_sentiment`` that runs in the sentiment worker pool.
+
+    Short texts are answered from the sentiment cache when possible.
+    """
+    key = sentiment_cache.key_for(text)
+    if key is not None:
+        cached = sentiment_cache.get(key)
+        if cached is not None:
+            return cached
+
+    with timed(SENTIMENT_DURATION.labels("single"), "sentiment"):
+        result = await sentiment_executor.run(analyze_sentiment, text)
+    if key is not None:
+        sentiment_cache.set(key, result)
+    return result
+
+
+async def analyze_sentiment_batch_async(texts: List[str]) -> List[Dict]:
+    """Awaitable ``analyze_sentiment_batch`` that runs in the sentiment worker pool."""
+    with timed(SENTIMENT_DURATION.labels("batch"), "sentiment"):
+        return await sentiment_executor.run(analyze_sentiment_batch, texts)
@@ -1,40 +1,113 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header
+# Imported first: creating the readiness singleton starts the clock, so start-up
+# logs show how long importing the rest of the app takes
+from readiness import readiness
+
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
 from typing import List, Optional
 import uuid
+import secrets
 from datetime import datetime, timezone
-# from emergentintegrations.llm.chat import LlmChat, UserMessage
 import asyncio
+import json
+import time
+
+import anyio
 
 # Import custom modules
-from auth_utils import get_password_hash, verify_password, create_access_token, decode_token
-from sentiment_analyzer import analyze_sentiment, get_supportive_message
+from audio_catalog import audio_catalog, seed_audio_catalog, AUDIO_CACHE_CONTROL
+from auth_utils import (
+    get_password_hash_async, verify_and_update_password_async, PasswordHashingBusy,
+    shutdown_password_hashing, warm_up_password_hashing, create_access_token, decode_token_cached,
+    token_cache
+)
+from cache_utils import LRUCache
+from chat_context import build_chat_messages, schedule_summary_refresh, load_encoding
+from data_export import export_user_history
+from fast_json import ModelRows, SelectiveGZipMiddleware
+from ingest import INGEST_BATCH_MAX, client_timestamp, insert_idempotent, batch_summary
+from db_indexes import index_manager
+from http_cache import etag_matches, not_modified, weak_etag, PRIVATE_REVALIDATE
+import llm_client
+from llm_gateway import llm_gateway
+from metrics import (
+    registry, mongo_command_metrics, event_loop_lag_monitor, MetricsMiddleware, LLM_FALLBACKS,
+    CONTENT_TYPE as METRICS_CONTENT_TYPE
+)
+from migrations import migrate_timestamps
+from pagination import fetch_page, InvalidCursor
+from stats import (
+    get_user_stats, ensure_user_stats, rollup_mood_stats, rollup_game_stats, rollup_versions,
+    record_mood, record_moods, record_game, record_games, record_journal, record_chat
+)
+from sentiment_analyzer import get_supportive_message
+from sentiment_cache import sentiment_cache
+from sentiment_executor import (
+    sentiment_executor, analyze_sentiment_async, analyze_sentiment_batch_async, SentimentBackpressure
+)
+from write_buffer import write_buffer
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+
+
+def connect_database():
+    """
+    Create the Motor client and database handle.
+
+    Runs at import; gunicorn.conf.py runs it again in every worker after
+    forking, because a MongoClient must not be shared across a fork.
+    """
+    global client, db
+    # tz_aware so stored BSON dates come back as UTC-aware datetimes;
+    # the listener times every command for /metrics
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True, event_listeners=[mongo_command_metrics])
+    db = client[os.environ['DB_NAME']]
+
+
+connect_database()
 
 # Security
 security = HTTPBearer()
 
+# Authenticated principals, cached by user id to skip the users lookup on every request
+PRINCIPAL_CACHE_SIZE = int(os.getenv('PRINCIPAL_CACHE_SIZE', '10000'))
+PRINCIPAL_CACHE_TTL = float(os.getenv('PRINCIPAL_CACHE_TTL', '60'))
+PRINCIPAL_PROJECTION = {"_id": 0, "id": 1, "name": 1, "email": 1, "age": 1, "emergency_contacts": 1}
+principal_cache = LRUCache(max_entries=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
+
+# History endpoints return the cursor for the next page in this header
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Lists whose inserts go through the write-behind buffer
+BUFFERED_LISTS = ("moods", "games", "chat")
+
+# Shared secret for admin-only endpoints (X-Admin-Token); unset disables them
+ADMIN_API_KEY = os.environ.get('ADMIN_API_KEY')
+
+# Responses smaller than this many bytes are sent uncompressed
+GZIP_MIN_SIZE = int(os.getenv('GZIP_MIN_SIZE', '1024'))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', '5'))
+
+# Largest number of texts accepted by /sentiment/batch
+SENTIMENT_BATCH_MAX = int(os.getenv('SENTIMENT_BATCH_MAX', '1000'))
+
 # Create the main app
 app = FastAPI(title="Buddy Mind Flow API")
 api_router = APIRouter(prefix="/api")
 
-# LLM Configuration
-EMERGENT_LLM_KEY = os.getenv('EMERGENT_LLM_KEY')
-
 
 # ============= MODELS =============
 
@@ -106,6 +179,13 @@ class MoodEntryCreate(BaseModel):
     intensity: int
     note: Optional[str] = None
 
+class MoodEntryBatchItem(MoodEntryCreate):
+    id: str = Field(..., min_length=1, max_length=64)  # client-generated, doubles as idempotency key
+    timestamp: Optional[datetime] = None  # when it was recorded offline
+
+class MoodEntryBatch(BaseModel):
+    items: List[MoodEntryBatchItem] = Field(..., max_length=INGEST_BATCH_MAX)
+
 
 # Journal Models
 class JournalEntry(BaseModel):
@@ -124,6 +204,13 @@ class JournalEntryCreate(BaseModel):
     is_voice: bool = False
     tags: List[str] = []
 
+class JournalEntryBatchItem(JournalEntryCreate):
+    id: str = Field(..., min_length=1, max_length=64)
+    timestamp: Optional[datetime] = None
+
+class JournalEntryBatch(BaseModel):
+    items: List[JournalEntryBatchItem] = Field(..., max_length=INGEST_BATCH_MAX)
+
 
 # Game Models
 class GameScore(BaseModel):
@@ -143,6 +230,13 @@ class GameScoreCreate(BaseModel):
     duration: Optional[int] = None
     completed: bool = False
 
+class GameScoreBatchItem(GameScoreCreate):
+    id: str = Field(..., min_length=1, max_length=64)
+    timestamp: Optional[datetime] = None
+
+class GameScoreBatch(BaseModel):
+    items: List[GameScoreBatchItem] = Field(..., max_length=INGEST_BATCH_MAX)
+
 
 # Audio Track Models
 class AudioTrack(BaseModel):
@@ -161,11 +255,29 @@ class AudioTrackCreate(BaseModel):
     duration: Optional[int] = None
 
 
+# Stored documents are model_dump()s of these models, so list endpoints send
+# them as they are; response_model still documents them in OpenAPI
+CHAT_ROWS = ModelRows(ChatMessage)
+MOOD_ROWS = ModelRows(MoodEntry)
+JOURNAL_ROWS = ModelRows(JournalEntry)
+GAME_ROWS = ModelRows(GameScore)
+
+
+# Sentiment Models
+class SentimentBatchRequest(BaseModel):
+    texts: List[str] = Field(..., max_length=SENTIMENT_BATCH_MAX)
+
+
 # ============= AUTH DEPENDENCIES =============
 
+def invalidate_principal(user_id: str):
+    """Drop a cached principal; call after any write to that user's document"""
+    principal_cache.invalidate(user_id)
+
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
-    payload = decode_token(token)
+    payload = decode_token_cached(token)
     
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid authentication token")
@@ -174,20 +286,106 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token payload")
     
-    user = await db.users.find_one({"id": user_id}, {"_id": 0})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    user = principal_cache.get(user_id)
+    if user is None:
+        user = await db.users.find_one({"id": user_id}, PRINCIPAL_PROJECTION)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        principal_cache.set(user_id, user)
     
     return user
 
 
 # ============= ROUTES =============
 
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+
+async def user_etag(user: dict, names: tuple, *params, fresh: bool = False) -> str:
+    """
+    ETag for a per-user response, from the user's change versions for ``names``.
+
+    Versions come from the stats rollup, so checking an ETag costs no query
+    against the collection it describes. Pass ``fresh`` when validating a
+    client's ETag: this process's cached rollup may predate a write handled by
+    another worker, and would answer 304 for data that has changed. The fresh
+    rollup replaces the cached one, so the response body agrees with the ETag.
+    """
+    rollup = await get_user_stats(db, user['id'], cached=not fresh)
+    return weak_etag(user['id'], rollup_versions(rollup, *names), *params)
+
+
+async def list_etag(user: dict, name: str, *params, fresh: bool = False) -> Optional[str]:
+    """
+    ETag for a page of one of the user's lists, or None if it cannot be trusted.
+
+    In fire_and_forget mode a write bumps the list's version before its document
+    is readable, so a page read in between would be cached under the new version.
+    """
+    if name in BUFFERED_LISTS and write_buffer.enabled and write_buffer.mode == "fire_and_forget":
+        return None
+    return await user_etag(user, (name,), *params, fresh=fresh)
+
+
+def set_etag(response: Response, etag: Optional[str]):
+    if etag is None:
+        return
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = PRIVATE_REVALIDATE
+
+
 @api_router.get("/")
 async def root():
     return {"message": "Welcome to Buddy Mind Flow API with AI Therapist", "status": "active"}
 
 
+@api_router.get("/health/indexes")
+async def get_index_status():
+    """Report the start-up index build and whether hot queries use them"""
+    return index_manager.summary()
+
+
+@api_router.get("/health/writes")
+async def get_write_buffer_status():
+    """Write-behind buffer mode, batch sizes and flush latency"""
+    return write_buffer.stats()
+
+
+@api_router.get("/health/llm")
+async def get_llm_status():
+    """Circuit breaker state, concurrency and latency of calls to the model"""
+    return llm_gateway.stats()
+
+
+@api_router.get("/health/sentiment")
+async def get_sentiment_status():
+    """Sentiment worker pool size, queue depth and rejections"""
+    return sentiment_executor.stats()
+
+
+@api_router.get("/health/caches")
+async def get_cache_status():
+    """Entries, hits, misses and evictions of this process's caches"""
+    return {
+        "sentiment": sentiment_cache.stats(),
+        "tokens": token_cache.stats(),
+        "principals": principal_cache.stats(),
+    }
+
+
+@api_router.get("/health/live")
+async def get_liveness():
+    """Liveness probe: the process is up and its event loop is serving requests"""
+    return {"status": "alive"}
+
+
+@api_router.get("/health/ready")
+async def get_readiness():
+    """Readiness probe: 503 until the start-up warm-up has finished"""
+    summary = readiness.summary()
+    return JSONResponse(status_code=200 if summary["ready"] else 503, content=summary)
 
 
 # ============= AUTH ROUTES =============
@@ -209,13 +407,16 @@ async def register(user_data: UserCreate):
     )
     
     user_dict = user_obj.model_dump()
-    user_dict['password'] = get_password_hash(user_data.password)
-    user_dict['created_at'] = user_dict['created_at'].isoformat()
+    user_dict['password'] = await get_password_hash_async(user_data.password)
     
     # Convert emergency contacts to dicts
     user_dict['emergency_contacts'] = [contact.model_dump() for contact in user_obj.emergency_contacts]
     
-    await db.users.insert_one(user_dict)
+    try:
+        await db.users.insert_one(user_dict)
+    except DuplicateKeyError:
+        # Lost a race with a concurrent registration for the same email
+        raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create token
     token = create_access_token({"user_id": user_obj.id})
@@ -235,10 +436,18 @@ async def register(user_data: UserCreate):
 async def login(credentials: UserLogin):
     """Login user"""
     user = await db.users.find_one({"email": credentials.email})
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
     
-    if not user or not verify_password(credentials.password, user.get('password', '')):
+    valid, new_hash = await verify_and_update_password_async(credentials.password, user.get('password', ''))
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
+    # Transparently upgrade hashes made with an old bcrypt cost factor
+    if new_hash:
+        await db.users.update_one({"id": user['id']}, {"$set": {"password": new_hash}})
+        invalidate_principal(user['id'])
+    
     token = create_access_token({"user_id": user['id']})
     
     return {
@@ -260,73 +469,122 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user)):
 
 # ============= AI THERAPIST CHATBOT =============
 
+def fallback_response(supportive_msg: str) -> str:
+    return f"I understand you're sharing something important. {supportive_msg} While I'm experiencing technical difficulties, please know that your feelings are valid. Would you like to try expressing your thoughts in your journal instead?"
+
+
+async def save_chat_message(user_id: str, text: str, response: str, sentiment: dict) -> ChatMessage:
+    chat_obj = ChatMessage(
+        user_id=user_id,
+        message=text,
+        response=response,
+        sentiment=sentiment
+    )
+    
+    doc = chat_obj.model_dump()
+    await ensure_user_stats(db, user_id)
+    await write_buffer.insert(db.chat_history, doc)
+    await record_chat(db, user_id)
+    schedule_summary_refresh(db, user_id)
+    
+    return chat_obj
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
 @api_router.post("/chat", response_model=ChatMessage)
 async def chat_with_therapist(message: ChatMessageCreate, current_user: dict = Depends(get_current_user)):
     """Chat with AI therapist"""
     
     # Analyze sentiment
-    sentiment = analyze_sentiment(message.message)
+    sentiment = await analyze_sentiment_async(message.message)
     supportive_msg = get_supportive_message(sentiment)
     
-    # Initialize AI chat
     try:
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"therapy_{current_user['id']}",
-            system_message=f"""You are a compassionate, professional AI therapist helping {current_user['name']}, 
-a young person seeking mental health support. Your role is to:
-
-1. Listen empathetically and validate their feelings
-2. Ask thoughtful follow-up questions to understand their situation
-3. Provide gentle guidance and coping strategies
-4. Recognize signs of crisis and recommend professional help when needed
-5. Use age-appropriate language and maintain a warm, supportive tone
-6. Never judge or criticize
-7. Encourage healthy habits like exercise, sleep, and social connection
-8. Celebrate their strengths and progress
-
-Important: If the user expresses thoughts of self-harm or suicide, immediately encourage them to reach out to their emergency contacts or call a crisis helpline.
-
-Current sentiment analysis: {sentiment['sentiment']} (emotion: {sentiment['emotion']})
-{supportive_msg}"""
-        ).with_model("openai", "gpt-4o")
-        
-        user_msg = UserMessage(text=message.message)
-        ai_response = await chat.send_message(user_msg)
-        
+        messages = await build_chat_messages(db, current_user, message.message, sentiment, supportive_msg)
+        ai_response = await llm_gateway.complete(current_user['id'], messages)
     except Exception as e:
         logging.error(f"AI Chat error: {str(e)}")
+        LLM_FALLBACKS.labels("chat", type(e).__name__).inc()
         # Fallback response
-        ai_response = f"I understand you're sharing something important. {supportive_msg} While I'm experiencing technical difficulties, please know that your feelings are valid. Would you like to try expressing your thoughts in your journal instead?"
+        ai_response = fallback_response(supportive_msg)
     
     # Save chat to database
-    chat_obj = ChatMessage(
-        user_id=current_user['id'],
-        message=message.message,
-        response=ai_response,
-        sentiment=sentiment
-    )
+    return await save_chat_message(current_user['id'], message.message, ai_response, sentiment)
+
+
+@api_router.post("/chat/stream")
+async def chat_with_therapist_stream(message: ChatMessageCreate, current_user: dict = Depends(get_current_user)):
+    """
+    Chat with AI therapist, streaming the reply as server-sent events.
+
+    Emits one ``token`` event per text delta and a final ``done`` event with the
+    stored ChatMessage.
+    """
+    sentiment = await analyze_sentiment_async(message.message)
+    supportive_msg = get_supportive_message(sentiment)
     
-    doc = chat_obj.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
-    await db.chat_history.insert_one(doc)
+    async def events():
+        parts = []
+        chat_obj = None
+        try:
+            reason = "EmptyReply"
+            try:
+                messages = await build_chat_messages(db, current_user, message.message, sentiment, supportive_msg)
+                async for token in llm_gateway.stream(current_user['id'], messages):
+                    parts.append(token)
+                    yield sse_event("token", {"text": token})
+            except Exception as e:
+                logging.error(f"AI Chat stream error: {str(e)}")
+                reason = type(e).__name__
+            if not parts:
+                # Nothing reached the client (an error, or a reply without any text),
+                # so the fallback can stand in for the reply
+                LLM_FALLBACKS.labels("chat_stream", reason).inc()
+                parts.append(fallback_response(supportive_msg))
+                yield sse_event("token", {"text": parts[0]})
+        finally:
+            # Also runs when the client disconnects mid-stream: keep whatever was
+            # already shown, and shield the write from the cancellation
+            if parts:
+                with anyio.CancelScope(shield=True):
+                    chat_obj = await save_chat_message(
+                        current_user['id'], message.message, "".join(parts), sentiment
+                    )
+        yield sse_event("done", chat_obj.model_dump(mode="json"))
     
-    return chat_obj
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @api_router.get("/chat/history", response_model=List[ChatMessage])
-async def get_chat_history(limit: int = 20, current_user: dict = Depends(get_current_user)):
-    """Get chat history"""
-    history = await db.chat_history.find(
-        {"user_id": current_user['id']}, 
-        {"_id": 0}
-    ).sort("timestamp", -1).to_list(limit)
+async def get_chat_history(
+    response: Response,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get chat history, one page at a time"""
+    etag = await list_etag(current_user, "chat", limit, cursor, since, until, fresh=if_none_match is not None)
+    if etag and etag_matches(if_none_match, etag):
+        return not_modified(etag, PRIVATE_REVALIDATE)
     
-    for entry in history:
-        if isinstance(entry['timestamp'], str):
-            entry['timestamp'] = datetime.fromisoformat(entry['timestamp'])
+    history, next_cursor = await fetch_page(
+        db.chat_history, {"user_id": current_user['id']}, limit, cursor, since, until,
+        projection=CHAT_ROWS.projection
+    )
+    set_next_cursor(response, next_cursor)
+    set_etag(response, etag)
     
-    return history
+    return CHAT_ROWS.response(history, response)
 
 
 # ============= MOOD TRACKING =============
@@ -338,7 +596,7 @@ async def create_mood_entry(entry: MoodEntryCreate, current_user: dict = Depends
     # Analyze sentiment if note exists
     sentiment = None
     if entry.note:
-        sentiment = analyze_sentiment(entry.note)
+        sentiment = await analyze_sentiment_async(entry.note)
     
     mood_obj = MoodEntry(
         user_id=current_user['id'],
@@ -349,69 +607,78 @@ async def create_mood_entry(entry: MoodEntryCreate, current_user: dict = Depends
     )
     
     doc = mood_obj.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
-    await db.mood_entries.insert_one(doc)
+    await ensure_user_stats(db, current_user['id'])
+    await write_buffer.insert(db.mood_entries, doc)
+    await record_mood(db, current_user['id'], doc)
     
     return mood_obj
 
 
+@api_router.post("/moods/batch")
+async def create_mood_entries_batch(batch: MoodEntryBatch, current_user: dict = Depends(get_current_user)):
+    """Store mood entries recorded offline; safe to retry, ids already stored are skipped"""
+    notes = [item.note for item in batch.items if item.note]
+    sentiments = iter(await analyze_sentiment_batch_async(notes)) if notes else iter(())
+    
+    now = datetime.now(timezone.utc)
+    docs = [
+        MoodEntry(
+            id=item.id,
+            user_id=current_user['id'],
+            mood=item.mood,
+            intensity=item.intensity,
+            note=item.note,
+            sentiment=next(sentiments) if item.note else None,
+            timestamp=client_timestamp(item.timestamp, now)
+        ).model_dump()
+        for item in batch.items
+    ]
+    
+    await ensure_user_stats(db, current_user['id'])
+    created, results = await insert_idempotent(db.mood_entries, docs)
+    await record_moods(db, current_user['id'], created)
+    
+    return batch_summary(results)
+
+
 @api_router.get("/moods", response_model=List[MoodEntry])
-async def get_mood_entries(limit: int = 50, current_user: dict = Depends(get_current_user)):
-    """Get recent mood entries"""
-    entries = await db.mood_entries.find(
-        {"user_id": current_user['id']}, 
-        {"_id": 0}
-    ).sort("timestamp", -1).to_list(limit)
+async def get_mood_entries(
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get mood entries, newest first, one page at a time"""
+    etag = await list_etag(current_user, "moods", limit, cursor, since, until, fresh=if_none_match is not None)
+    if etag and etag_matches(if_none_match, etag):
+        return not_modified(etag, PRIVATE_REVALIDATE)
     
-    for entry in entries:
-        if isinstance(entry['timestamp'], str):
-            entry['timestamp'] = datetime.fromisoformat(entry['timestamp'])
+    entries, next_cursor = await fetch_page(
+        db.mood_entries, {"user_id": current_user['id']}, limit, cursor, since, until,
+        projection=MOOD_ROWS.projection
+    )
+    set_next_cursor(response, next_cursor)
+    set_etag(response, etag)
     
-    return entries
+    return MOOD_ROWS.response(entries, response)
 
 
 @api_router.get("/moods/stats")
-async def get_mood_stats(current_user: dict = Depends(get_current_user)):
+async def get_mood_stats(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
     """Get mood statistics with sentiment insights"""
-    entries = await db.mood_entries.find(
-        {"user_id": current_user['id']}, 
-        {"_id": 0}
-    ).to_list(1000)
-    
-    if not entries:
-        return {
-            "total_entries": 0,
-            "most_common_mood": None,
-            "average_intensity": 0,
-            "mood_distribution": {},
-            "sentiment_trend": "neutral"
-        }
-    
-    mood_counts = {}
-    total_intensity = 0
-    sentiment_scores = []
-    
-    for entry in entries:
-        mood = entry['mood']
-        mood_counts[mood] = mood_counts.get(mood, 0) + 1
-        total_intensity += entry['intensity']
-        
-        if entry.get('sentiment'):
-            sentiment_scores.append(entry['sentiment']['polarity'])
+    etag = await user_etag(current_user, ("moods",), "stats", fresh=if_none_match is not None)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, PRIVATE_REVALIDATE)
     
-    most_common = max(mood_counts, key=mood_counts.get)
-    avg_sentiment = sum(sentiment_scores) / len(sentiment_scores) if sentiment_scores else 0
-    
-    sentiment_trend = "positive" if avg_sentiment > 0.1 else "negative" if avg_sentiment < -0.1 else "neutral"
-    
-    return {
-        "total_entries": len(entries),
-        "most_common_mood": most_common,
-        "average_intensity": round(total_intensity / len(entries), 2),
-        "mood_distribution": mood_counts,
-        "sentiment_trend": sentiment_trend,
-        "average_sentiment_score": round(avg_sentiment, 2)
-    }
+    set_etag(response, etag)
+    return rollup_mood_stats(await get_user_stats(db, current_user['id']))
 
 
 # ============= JOURNAL =============
@@ -421,7 +688,7 @@ async def create_journal_entry(entry: JournalEntryCreate, current_user: dict = D
     """Create a new journal entry with sentiment analysis"""
     
     # Analyze sentiment
-    sentiment = analyze_sentiment(entry.content)
+    sentiment = await analyze_sentiment_async(entry.content)
     
     journal_obj = JournalEntry(
         user_id=current_user['id'],
@@ -432,30 +699,71 @@ async def create_journal_entry(entry: JournalEntryCreate, current_user: dict = D
     )
     
     doc = journal_obj.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
+    await ensure_user_stats(db, current_user['id'])
     await db.journal_entries.insert_one(doc)
+    await record_journal(db, current_user['id'])
     
     return journal_obj
 
 
+@api_router.post("/journals/batch")
+async def create_journal_entries_batch(batch: JournalEntryBatch, current_user: dict = Depends(get_current_user)):
+    """Store journal entries written offline; safe to retry, ids already stored are skipped"""
+    sentiments = await analyze_sentiment_batch_async([item.content for item in batch.items]) if batch.items else []
+    
+    now = datetime.now(timezone.utc)
+    docs = [
+        JournalEntry(
+            id=item.id,
+            user_id=current_user['id'],
+            content=item.content,
+            is_voice=item.is_voice,
+            tags=item.tags,
+            sentiment=sentiment,
+            timestamp=client_timestamp(item.timestamp, now)
+        ).model_dump()
+        for item, sentiment in zip(batch.items, sentiments)
+    ]
+    
+    await ensure_user_stats(db, current_user['id'])
+    created, results = await insert_idempotent(db.journal_entries, docs)
+    if created:
+        await record_journal(db, current_user['id'], len(created))
+    
+    return batch_summary(results)
+
+
 @api_router.get("/journals", response_model=List[JournalEntry])
-async def get_journal_entries(limit: int = 20, current_user: dict = Depends(get_current_user)):
-    """Get recent journal entries"""
-    entries = await db.journal_entries.find(
-        {"user_id": current_user['id']}, 
-        {"_id": 0}
-    ).sort("timestamp", -1).to_list(limit)
+async def get_journal_entries(
+    response: Response,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get journal entries, newest first, one page at a time"""
+    etag = await user_etag(
+        current_user, ("journals",), limit, cursor, since, until, fresh=if_none_match is not None
+    )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, PRIVATE_REVALIDATE)
     
-    for entry in entries:
-        if isinstance(entry['timestamp'], str):
-            entry['timestamp'] = datetime.fromisoformat(entry['timestamp'])
+    entries, next_cursor = await fetch_page(
+        db.journal_entries, {"user_id": current_user['id']}, limit, cursor, since, until,
+        projection=JOURNAL_ROWS.projection
+    )
+    set_next_cursor(response, next_cursor)
+    set_etag(response, etag)
     
-    return entries
+    return JOURNAL_ROWS.response(entries, response)
 
 
 @api_router.delete("/journals/{journal_id}")
 async def delete_journal_entry(journal_id: str, current_user: dict = Depends(get_current_user)):
     """Delete a journal entry"""
+    await ensure_user_stats(db, current_user['id'])
     result = await db.journal_entries.delete_one({
         "id": journal_id, 
         "user_id": current_user['id']
@@ -464,6 +772,8 @@ async def delete_journal_entry(journal_id: str, current_user: dict = Depends(get
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Journal entry not found")
     
+    await record_journal(db, current_user['id'], -1)
+    
     return {"message": "Journal entry deleted successfully"}
 
 
@@ -481,148 +791,172 @@ async def save_game_score(score: GameScoreCreate, current_user: dict = Depends(g
     )
     
     doc = score_obj.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
-    await db.game_scores.insert_one(doc)
+    await ensure_user_stats(db, current_user['id'])
+    await write_buffer.insert(db.game_scores, doc)
+    await record_game(db, current_user['id'], doc)
     
     return score_obj
 
 
+@api_router.post("/games/scores/batch")
+async def save_game_scores_batch(batch: GameScoreBatch, current_user: dict = Depends(get_current_user)):
+    """Store game sessions played offline; safe to retry, ids already stored are skipped"""
+    now = datetime.now(timezone.utc)
+    docs = [
+        GameScore(
+            id=item.id,
+            user_id=current_user['id'],
+            game_type=item.game_type,
+            score=item.score,
+            duration=item.duration,
+            completed=item.completed,
+            timestamp=client_timestamp(item.timestamp, now)
+        ).model_dump()
+        for item in batch.items
+    ]
+    
+    await ensure_user_stats(db, current_user['id'])
+    created, results = await insert_idempotent(db.game_scores, docs)
+    await record_games(db, current_user['id'], created)
+    
+    return batch_summary(results)
+
+
 @api_router.get("/games/scores", response_model=List[GameScore])
 async def get_game_scores(
+    response: Response,
     game_type: Optional[str] = None, 
     limit: int = 20, 
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    if_none_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get game scores"""
+    """Get game scores, one page at a time"""
+    etag = await list_etag(
+        current_user, "games", game_type, limit, cursor, since, until, fresh=if_none_match is not None
+    )
+    if etag and etag_matches(if_none_match, etag):
+        return not_modified(etag, PRIVATE_REVALIDATE)
+    
     query = {"user_id": current_user['id']}
     if game_type:
         query["game_type"] = game_type
     
-    scores = await db.game_scores.find(query, {"_id": 0}).sort("timestamp", -1).to_list(limit)
-    
-    for score in scores:
-        if isinstance(score['timestamp'], str):
-            score['timestamp'] = datetime.fromisoformat(score['timestamp'])
+    scores, next_cursor = await fetch_page(
+        db.game_scores, query, limit, cursor, since, until, projection=GAME_ROWS.projection
+    )
+    set_next_cursor(response, next_cursor)
+    set_etag(response, etag)
     
-    return scores
+    return GAME_ROWS.response(scores, response)
 
 
 @api_router.get("/games/stats")
-async def get_game_stats(current_user: dict = Depends(get_current_user)):
+async def get_game_stats(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
     """Get overall game statistics"""
-    scores = await db.game_scores.find({"user_id": current_user['id']}, {"_id": 0}).to_list(1000)
-    
-    if not scores:
-        return {
-            "total_games_played": 0,
-            "games_completed": 0,
-            "total_time_spent": 0,
-            "favorite_game": None
-        }
+    etag = await user_etag(current_user, ("games",), "stats", fresh=if_none_match is not None)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, PRIVATE_REVALIDATE)
     
-    game_counts = {}
-    total_time = 0
-    completed = 0
-    
-    for score in scores:
-        game_type = score['game_type']
-        game_counts[game_type] = game_counts.get(game_type, 0) + 1
-        if score.get('duration'):
-            total_time += score['duration']
-        if score.get('completed'):
-            completed += 1
-    
-    favorite = max(game_counts, key=game_counts.get) if game_counts else None
-    
-    return {
-        "total_games_played": len(scores),
-        "games_completed": completed,
-        "total_time_spent": total_time,
-        "favorite_game": favorite,
-        "game_distribution": game_counts
-    }
+    set_etag(response, etag)
+    return rollup_game_stats(await get_user_stats(db, current_user['id']))
 
 
 # ============= AUDIO =============
 
 @api_router.get("/audio/tracks", response_model=List[AudioTrack])
-async def get_audio_tracks():
+async def get_audio_tracks(if_none_match: Optional[str] = Header(None)):
     """Get all available audio tracks"""
-    tracks = await db.audio_tracks.find({}, {"_id": 0}).to_list(100)
-    
-    if not tracks:
-        default_tracks = [
-            {
-                "id": str(uuid.uuid4()),
-                "title": "Ocean Waves",
-                "url": "https://assets.mixkit.co/active_storage/sfx/2393/2393-preview.mp3",
-                "category": "nature",
-                "duration": 180
-            },
-            {
-                "id": str(uuid.uuid4()),
-                "title": "Rain Sounds",
-                "url": "https://assets.mixkit.co/active_storage/sfx/2410/2410-preview.mp3",
-                "category": "nature",
-                "duration": 240
-            },
-            {
-                "id": str(uuid.uuid4()),
-                "title": "Forest Ambience",
-                "url": "https://assets.mixkit.co/active_storage/sfx/2459/2459-preview.mp3",
-                "category": "nature",
-                "duration": 200
-            },
-            {
-                "id": str(uuid.uuid4()),
-                "title": "Peaceful Piano",
-                "url": "https://assets.mixkit.co/active_storage/sfx/2458/2458-preview.mp3",
-                "category": "meditation",
-                "duration": 220
-            },
-            {
-                "id": str(uuid.uuid4()),
-                "title": "Calm Meditation",
-                "url": "https://assets.mixkit.co/active_storage/sfx/2457/2457-preview.mp3",
-                "category": "meditation",
-                "duration": 300
-            }
-        ]
-        
-        if default_tracks:
-            await db.audio_tracks.insert_many(default_tracks)
-        
-        return [AudioTrack(**track) for track in default_tracks]
-    
-    return tracks
+    catalog = await audio_catalog.get(db)
+    if etag_matches(if_none_match, catalog.etag):
+        return not_modified(catalog.etag, AUDIO_CACHE_CONTROL)
+    
+    # The catalog is serialised once per version, not once per request
+    return Response(
+        content=catalog.body,
+        media_type="application/json",
+        headers={"ETag": catalog.etag, "Cache-Control": AUDIO_CACHE_CONTROL},
+    )
+
+
+@api_router.post("/audio/tracks", response_model=AudioTrack)
+async def create_audio_track(track: AudioTrackCreate, x_admin_token: Optional[str] = Header(None)):
+    """Add a track to the catalog (admin only)"""
+    if not ADMIN_API_KEY or not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_API_KEY):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    
+    track_obj = AudioTrack(**track.model_dump())
+    await audio_catalog.add_track(db, track_obj.model_dump())
+    
+    return track_obj
+
+
+# ============= SENTIMENT =============
+
+@api_router.post("/sentiment/batch", response_model=List[dict])
+async def analyze_sentiment_batch_route(batch: SentimentBatchRequest, current_user: dict = Depends(get_current_user)):
+    """Analyze many texts in one call (used for re-scoring historical entries)"""
+    return await analyze_sentiment_batch_async(batch.texts)
 
 
 # ============= DASHBOARD =============
 
 @api_router.get("/dashboard/stats")
-async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
+async def get_dashboard_stats(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
     """Get comprehensive dashboard statistics"""
-    mood_count = await db.mood_entries.count_documents({"user_id": current_user['id']})
-    journal_count = await db.journal_entries.count_documents({"user_id": current_user['id']})
-    game_count = await db.game_scores.count_documents({"user_id": current_user['id']})
-    chat_count = await db.chat_history.count_documents({"user_id": current_user['id']})
-    
-    recent_mood = await db.mood_entries.find_one(
-        {"user_id": current_user['id']}, 
-        {"_id": 0}, 
-        sort=[("timestamp", -1)]
+    etag = await user_etag(
+        current_user, ("moods", "journals", "games", "chat"), "dashboard", current_user['name'],
+        fresh=if_none_match is not None
     )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, PRIVATE_REVALIDATE)
+    
+    rollup = await get_user_stats(db, current_user['id'])
+    set_etag(response, etag)
     
     return {
-        "total_mood_entries": mood_count,
-        "total_journal_entries": journal_count,
-        "total_games_played": game_count,
-        "total_chat_messages": chat_count,
-        "recent_mood": recent_mood['mood'] if recent_mood else None,
+        "total_mood_entries": rollup.get('mood_count', 0),
+        "total_journal_entries": rollup.get('journal_count', 0),
+        "total_games_played": rollup.get('game_count', 0),
+        "total_chat_messages": rollup.get('chat_count', 0),
+        "recent_mood": rollup.get('recent_mood'),
         "user_name": current_user['name']
     }
 
 
+# ============= EXPORT =============
+
+@api_router.get("/export")
+async def export_history(gzip: bool = False, current_user: dict = Depends(get_current_user)):
+    """Download the user's full history as NDJSON, streamed as it is read"""
+    filename = f"buddy-mind-flow-{datetime.now(timezone.utc):%Y%m%d}.ndjson"
+    if gzip:
+        filename += ".gz"
+    return StreamingResponse(
+        export_user_history(db, current_user, compress=gzip),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# ============= METRICS =============
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus text exposition of request, database, sentiment, bcrypt and LLM timings"""
+    return Response(content=registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 # Include router
 app.include_router(api_router)
 
@@ -633,8 +967,20 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
+)
+
+# Compress large responses; SSE must stream unbuffered and the export compresses itself
+app.add_middleware(
+    SelectiveGZipMiddleware,
+    minimum_size=GZIP_MIN_SIZE,
+    compresslevel=GZIP_LEVEL,
+    exclude_paths=["/api/chat/stream", "/api/export"],
 )
 
+# Outermost, so request timings include compression and CORS handling
+app.add_middleware(MetricsMiddleware)
+
 # Logging
 logging.basicConfig(
     level=logging.INFO,
@@ -643,6 +989,95 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+@app.exception_handler(SentimentBackpressure)
+async def sentiment_backpressure_handler(request: Request, exc: SentimentBackpressure):
+    logger.warning(f"Sentiment backpressure: {str(exc)}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Sentiment analysis is busy, please try again shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
+@app.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusy):
+    logger.warning(f"Password hashing backpressure: {str(exc)}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many sign-in attempts right now, please try again shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
+# Everything above runs when the module is imported
+readiness.import_ms = round((time.perf_counter() - readiness.created_at) * 1000, 1)
+
+
+@app.on_event("startup")
+async def start_sentiment_executor():
+    sentiment_executor.start()
+
+
+@app.on_event("startup")
+async def start_warm_up():
+    # One-time costs paid in the background instead of by the first requests;
+    # /api/health/ready reports 503 until every step is done
+    logger.info(f"Imported the app in {readiness.import_ms} ms, warming up")
+    readiness.add_step("mongo", lambda: client.admin.command("ping"))
+    readiness.add_step("sentiment", sentiment_executor.wait_warm)
+    readiness.add_step("bcrypt", warm_up_password_hashing)
+    # Token counts use an estimate until (or if it fails to) load
+    readiness.add_step("chat_tokenizer", lambda: asyncio.to_thread(load_encoding), optional=True)
+    readiness.start()
+
+
+@app.on_event("startup")
+async def start_event_loop_lag_monitor():
+    event_loop_lag_monitor.start()
+
+
+@app.on_event("startup")
+async def load_audio_catalog():
+    try:
+        await seed_audio_catalog(db)
+        await audio_catalog.load(db)
+    except Exception as e:
+        # The catalog loads lazily on the first request instead
+        logger.error(f"Audio catalog could not be loaded at start-up: {str(e)}")
+
+
+@app.on_event("startup")
+async def build_indexes():
+    # Runs in the background so a slow index build never delays serving
+    app.state.index_task = asyncio.create_task(index_manager.run(db))
+
+
+@app.on_event("startup")
+async def start_timestamp_migration():
+    # Converts legacy ISO-string timestamps to BSON dates in small resumable batches
+    if os.environ.get('TIMESTAMP_MIGRATION_ON_STARTUP', 'true').lower() == 'true':
+        app.state.migration_task = asyncio.create_task(_run_timestamp_migration())
+
+
+async def _run_timestamp_migration():
+    try:
+        await migrate_timestamps(db)
+    except Exception as e:
+        logger.error(f"Timestamp migration stopped: {str(e)}")
+
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    # Buffered inserts must reach the database before the client goes away
+    await readiness.stop()
+    await write_buffer.close()
+    await event_loop_lag_monitor.stop()
+    client.close()
+    sentiment_executor.shutdown()
+    await llm_client.close_client()
+    shutdown_password_hashing()
\ No newline at end of file
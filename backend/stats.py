@@ -0,0 +1,425 @@
+import argparse
+import asyncio
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from cache_utils import LRUCache
+from write_buffer import write_buffer
+
+# Per-user rollup document, kept in step with every write:
+#   {user_id, mood_count, mood_distribution, mood_intensity_sum, mood_polarity_sum,
+#    mood_polarity_count, recent_mood, recent_mood_at, journal_count, chat_count,
+#    game_count, game_distribution, game_completed, game_time, versions, updated_at}
+USER_STATS = "user_stats"
+
+# versions.<name> is bumped on every write to that part of a user's data, and
+# drives the ETags of the endpoints that read it
+VERSIONED = ("moods", "journals", "games", "chat")
+
+# Dashboard pages re-read stats on every navigation, so keep each user's rollup
+# for a few seconds; this worker's own writes invalidate it immediately
+USER_STATS_CACHE_TTL = float(os.getenv("USER_STATS_CACHE_TTL", "5"))
+USER_STATS_CACHE_SIZE = int(os.getenv("USER_STATS_CACHE_SIZE", "10000"))
+stats_cache = LRUCache(max_entries=USER_STATS_CACHE_SIZE, ttl=USER_STATS_CACHE_TTL)
+# Users whose rollup is known to exist; rollups are never deleted, so no TTL
+known_rollups = LRUCache(max_entries=USER_STATS_CACHE_SIZE)
+
+
+def _sentiment_trend(average_polarity: float) -> str:
+    if average_polarity > 0.1:
+        return "positive"
+    if average_polarity < -0.1:
+        return "negative"
+    return "neutral"
+
+
+def _distribution(groups) -> Dict[str, int]:
+    return {group["_id"]: group["count"] for group in groups if group["_id"] is not None}
+
+
+def _most_common(distribution: Dict[str, int]) -> Optional[str]:
+    if not distribution:
+        return None
+    # Highest count, ties broken alphabetically so the answer is stable
+    return min(distribution, key=lambda key: (-distribution[key], key))
+
+
+def _field_key(value: str) -> str:
+    """Escape a user-supplied value so it can be used as a document field name"""
+    value = value.replace(".", "\uff0e")
+    return "\uff04" + value[1:] if value.startswith("$") else value
+
+
+def _unescape_key(key: str) -> str:
+    key = key.replace("\uff0e", ".")
+    return "$" + key[1:] if key.startswith("\uff04") else key
+
+
+def _unescape_distribution(distribution: Optional[Dict]) -> Dict[str, int]:
+    return {_unescape_key(k): v for k, v in (distribution or {}).items() if v > 0}
+
+
+MOOD_STATS_FACETS = {
+    "totals": [
+        {"$group": {
+            "_id": None,
+            "count": {"$sum": 1},
+            "intensity_sum": {"$sum": "$intensity"},
+            # Only moods with a note have a sentiment
+            "polarity_sum": {"$sum": "$sentiment.polarity"},
+            "polarity_count": {"$sum": {"$cond": [{"$isNumber": "$sentiment.polarity"}, 1, 0]}},
+        }},
+    ],
+    "distribution": [
+        {"$group": {"_id": "$mood", "count": {"$sum": 1}}},
+    ],
+}
+
+GAME_STATS_FACETS = {
+    "totals": [
+        {"$group": {
+            "_id": None,
+            "count": {"$sum": 1},
+            "completed": {"$sum": {"$cond": [{"$eq": ["$completed", True]}, 1, 0]}},
+            "total_time": {"$sum": "$duration"},
+        }},
+    ],
+    "distribution": [
+        {"$group": {"_id": "$game_type", "count": {"$sum": 1}}},
+    ],
+}
+
+
+async def _facet(collection, user_id: str, facets: Dict) -> Dict:
+    pipeline = [{"$match": {"user_id": user_id}}, {"$facet": facets}]
+    results = await collection.aggregate(pipeline).to_list(1)
+    return results[0] if results else {"totals": [], "distribution": []}
+
+
+def mood_stats_response(
+    count: int,
+    intensity_sum: float,
+    polarity_sum: float,
+    polarity_count: int,
+    distribution: Dict[str, int],
+) -> Dict:
+    """Shape mood totals and distribution the way /moods/stats returns them"""
+    if not count:
+        return {
+            "total_entries": 0,
+            "most_common_mood": None,
+            "average_intensity": 0,
+            "mood_distribution": {},
+            "sentiment_trend": "neutral"
+        }
+
+    average_polarity = polarity_sum / polarity_count if polarity_count else 0
+    return {
+        "total_entries": count,
+        "most_common_mood": _most_common(distribution),
+        "average_intensity": round(intensity_sum / count, 2),
+        "mood_distribution": distribution,
+        "sentiment_trend": _sentiment_trend(average_polarity),
+        "average_sentiment_score": round(average_polarity, 2)
+    }
+
+
+def game_stats_response(count: int, completed: int, total_time: int, distribution: Dict[str, int]) -> Dict:
+    """Shape game totals and distribution the way /games/stats returns them"""
+    if not count:
+        return {
+            "total_games_played": 0,
+            "games_completed": 0,
+            "total_time_spent": 0,
+            "favorite_game": None
+        }
+
+    return {
+        "total_games_played": count,
+        "games_completed": completed,
+        "total_time_spent": total_time,
+        "favorite_game": _most_common(distribution),
+        "game_distribution": distribution
+    }
+
+
+async def aggregate_mood_stats(db, user_id: str) -> Dict:
+    """Mood statistics over a user's whole history, computed server-side"""
+    result = await _facet(db.mood_entries, user_id, MOOD_STATS_FACETS)
+    totals = result["totals"][0] if result["totals"] else {}
+    return mood_stats_response(
+        totals.get("count", 0),
+        totals.get("intensity_sum", 0),
+        totals.get("polarity_sum", 0),
+        totals.get("polarity_count", 0),
+        _distribution(result["distribution"]),
+    )
+
+
+async def aggregate_game_stats(db, user_id: str) -> Dict:
+    """Game statistics over a user's whole history, computed server-side"""
+    result = await _facet(db.game_scores, user_id, GAME_STATS_FACETS)
+    totals = result["totals"][0] if result["totals"] else {}
+    return game_stats_response(
+        totals.get("count", 0),
+        totals.get("completed", 0),
+        totals.get("total_time", 0),
+        _distribution(result["distribution"]),
+    )
+
+
+# ============= ROLLUPS =============
+
+async def _rollup_from_sources(db, user_id: str) -> Dict:
+    """A user's rollup fields computed from the source collections (no versions)"""
+    moods, games, journal_count, chat_count, recent = await asyncio.gather(
+        _facet(db.mood_entries, user_id, MOOD_STATS_FACETS),
+        _facet(db.game_scores, user_id, GAME_STATS_FACETS),
+        db.journal_entries.count_documents({"user_id": user_id}),
+        db.chat_history.count_documents({"user_id": user_id}),
+        db.mood_entries.find_one(
+            {"user_id": user_id}, {"_id": 0, "mood": 1, "timestamp": 1}, sort=[("timestamp", -1)]
+        ),
+    )
+    mood_totals = moods["totals"][0] if moods["totals"] else {}
+    game_totals = games["totals"][0] if games["totals"] else {}
+
+    return {
+        "user_id": user_id,
+        "mood_count": mood_totals.get("count", 0),
+        "mood_distribution": {_field_key(k): v for k, v in _distribution(moods["distribution"]).items()},
+        "mood_intensity_sum": mood_totals.get("intensity_sum", 0),
+        "mood_polarity_sum": mood_totals.get("polarity_sum", 0),
+        "mood_polarity_count": mood_totals.get("polarity_count", 0),
+        "recent_mood": recent["mood"] if recent else None,
+        "recent_mood_at": recent["timestamp"] if recent else None,
+        "journal_count": journal_count,
+        "chat_count": chat_count,
+        "game_count": game_totals.get("count", 0),
+        "game_distribution": {_field_key(k): v for k, v in _distribution(games["distribution"]).items()},
+        "game_completed": game_totals.get("completed", 0),
+        "game_time": game_totals.get("total_time", 0),
+        "updated_at": datetime.now(timezone.utc),
+    }
+
+
+async def rebuild_user_stats(db, user_id: str) -> Dict:
+    """Recompute a user's rollup from the source collections and store it, replacing any counts"""
+    rollup = await _rollup_from_sources(db, user_id)
+    # A rebuild may change what any endpoint returns, so it bumps every version
+    rollup = await db[USER_STATS].find_one_and_update(
+        {"user_id": user_id},
+        {"$set": rollup, "$inc": {f"versions.{name}": 1 for name in VERSIONED}},
+        projection={"_id": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    stats_cache.invalidate(user_id)
+    return rollup
+
+
+async def create_user_stats(db, user_id: str) -> Dict:
+    """
+    Build a user's first rollup; if another request or worker created one meanwhile, keep theirs.
+
+    The existing rollup may already hold increments for writes this snapshot
+    also counted, so it must never be overwritten by one.
+    """
+    rollup = await _rollup_from_sources(db, user_id)
+    rollup["versions"] = {name: 1 for name in VERSIONED}
+    try:
+        return await db[USER_STATS].find_one_and_update(
+            {"user_id": user_id},
+            {"$setOnInsert": rollup},
+            projection={"_id": 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        # Two upserts raced; the unique index let the other one insert
+        return await db[USER_STATS].find_one({"user_id": user_id}, {"_id": 0})
+
+
+async def get_user_stats(db, user_id: str, cached: bool = True) -> Dict:
+    """
+    Read a user's rollup, building it on first use.
+
+    ``cached=False`` skips this process's copy, which may miss writes another
+    worker counted within the last USER_STATS_CACHE_TTL seconds.
+    """
+    if cached:
+        rollup = stats_cache.get(user_id)
+        if rollup is not None:
+            return rollup
+    rollup = await db[USER_STATS].find_one({"user_id": user_id}, {"_id": 0})
+    if rollup is None:
+        rollup = await create_user_stats(db, user_id)
+    known_rollups.set(user_id, True)
+    stats_cache.set(user_id, rollup)
+    return rollup
+
+
+async def ensure_user_stats(db, user_id: str):
+    """
+    Make sure the user's rollup exists before storing a write that record_* will count.
+
+    Built before the write, the rollup's snapshot cannot include it, so the
+    write is counted exactly once, by its increment.
+    """
+    if user_id not in known_rollups:
+        await get_user_stats(db, user_id)
+
+
+async def _apply(db, user_id: str, update: Dict):
+    update.setdefault("$set", {})["updated_at"] = datetime.now(timezone.utc)
+    result = await db[USER_STATS].update_one({"user_id": user_id}, update)
+    stats_cache.invalidate(user_id)
+    if result.matched_count == 0:
+        # No rollup, though writers call ensure_user_stats first (e.g. it was removed by
+        # hand): build it from the source collections. The write being recorded may still
+        # sit in the write-behind buffer (fire_and_forget), so flush it first for the
+        # rebuild to count it
+        await write_buffer.flush()
+        await rebuild_user_stats(db, user_id)
+
+
+def _mood_increments(entries) -> Dict:
+    inc = {"mood_count": 0, "mood_intensity_sum": 0, "versions.moods": 1}
+    for entry in entries:
+        inc["mood_count"] += 1
+        key = f"mood_distribution.{_field_key(entry['mood'])}"
+        inc[key] = inc.get(key, 0) + 1
+        inc["mood_intensity_sum"] += entry["intensity"]
+        polarity = (entry.get("sentiment") or {}).get("polarity")
+        if polarity is not None:
+            inc["mood_polarity_sum"] = inc.get("mood_polarity_sum", 0) + polarity
+            inc["mood_polarity_count"] = inc.get("mood_polarity_count", 0) + 1
+    return inc
+
+
+def _game_increments(scores) -> Dict:
+    inc = {"game_count": 0, "game_completed": 0, "game_time": 0, "versions.games": 1}
+    for score in scores:
+        inc["game_count"] += 1
+        key = f"game_distribution.{_field_key(score['game_type'])}"
+        inc[key] = inc.get(key, 0) + 1
+        inc["game_completed"] += 1 if score.get("completed") else 0
+        inc["game_time"] += score.get("duration") or 0
+    return inc
+
+
+async def record_mood(db, user_id: str, entry: Dict):
+    """Fold a newly stored mood entry into the user's rollup"""
+    await _apply(db, user_id, {
+        "$inc": _mood_increments([entry]),
+        "$set": {"recent_mood": entry["mood"], "recent_mood_at": entry["timestamp"]},
+    })
+
+
+async def record_moods(db, user_id: str, entries: List[Dict]):
+    """Fold a batch of stored mood entries, possibly recorded long ago, into the rollup"""
+    if not entries:
+        return
+    await _apply(db, user_id, {"$inc": _mood_increments(entries)})
+    # Offline entries can be older than the recent mood already stored
+    latest = max(entries, key=lambda entry: entry["timestamp"])
+    await db[USER_STATS].update_one(
+        {"user_id": user_id, "$or": [
+            {"recent_mood_at": None},
+            {"recent_mood_at": {"$lt": latest["timestamp"]}},
+        ]},
+        {"$set": {"recent_mood": latest["mood"], "recent_mood_at": latest["timestamp"]}},
+    )
+    stats_cache.invalidate(user_id)
+
+
+async def record_game(db, user_id: str, score: Dict):
+    """Fold a newly stored game score into the user's rollup"""
+    await _apply(db, user_id, {"$inc": _game_increments([score])})
+
+
+async def record_games(db, user_id: str, scores: List[Dict]):
+    """Fold a batch of stored game scores into the user's rollup in one update"""
+    if scores:
+        await _apply(db, user_id, {"$inc": _game_increments(scores)})
+
+
+async def record_journal(db, user_id: str, delta: int = 1):
+    """Count a stored (delta=1) or deleted (delta=-1) journal entry"""
+    await _apply(db, user_id, {"$inc": {"journal_count": delta, "versions.journals": 1}})
+
+
+async def record_chat(db, user_id: str):
+    await _apply(db, user_id, {"$inc": {"chat_count": 1, "versions.chat": 1}})
+
+
+def rollup_versions(rollup: Dict, *names: str) -> str:
+    """Compact "moods:3,games:7" summary of the named versions, for building ETags"""
+    versions = rollup.get("versions") or {}
+    return ",".join(f"{name}:{versions.get(name, 0)}" for name in names)
+
+
+def rollup_mood_stats(rollup: Dict) -> Dict:
+    return mood_stats_response(
+        rollup.get("mood_count", 0),
+        rollup.get("mood_intensity_sum", 0),
+        rollup.get("mood_polarity_sum", 0),
+        rollup.get("mood_polarity_count", 0),
+        _unescape_distribution(rollup.get("mood_distribution")),
+    )
+
+
+def rollup_game_stats(rollup: Dict) -> Dict:
+    return game_stats_response(
+        rollup.get("game_count", 0),
+        rollup.get("game_completed", 0),
+        rollup.get("game_time", 0),
+        _unescape_distribution(rollup.get("game_distribution")),
+    )
+
+
+async def rebuild_all_user_stats(db, batch_size: int = 100) -> int:
+    """Rebuild every user's rollup, a few users at a time; returns the number rebuilt"""
+    rebuilt = 0
+    batch = []
+    async for user in db.users.find({}, {"_id": 0, "id": 1}):
+        batch.append(rebuild_user_stats(db, user["id"]))
+        if len(batch) >= batch_size:
+            await asyncio.gather(*batch)
+            rebuilt += len(batch)
+            batch = []
+    if batch:
+        await asyncio.gather(*batch)
+        rebuilt += len(batch)
+    return rebuilt
+
+
+async def _main():
+    from pathlib import Path
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Rebuild per-user stats rollups to repair drift")
+    parser.add_argument("--user", help="only rebuild this user id")
+    args = parser.parse_args()
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+    try:
+        if args.user:
+            await rebuild_user_stats(db, args.user)
+            print(f"Rebuilt stats for user {args.user}")
+        else:
+            count = await rebuild_all_user_stats(db)
+            print(f"Rebuilt stats for {count} users")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
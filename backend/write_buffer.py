@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: when off, every insert is a plain insert_one on the request path
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "false").lower() == "true"
+# ack: the request waits until its batch is written, so errors still reach the caller.
+# fire_and_forget: the request returns at once; a crash before the next flush loses the
+# buffered documents, and reads issued right away may not see them yet (so the list
+# endpoints fed by the buffer send no ETag in this mode)
+WRITE_BEHIND_MODE = os.getenv("WRITE_BEHIND_MODE", "ack")
+# A collection's buffer is flushed when it holds this many documents ...
+WRITE_BEHIND_MAX_BATCH = int(os.getenv("WRITE_BEHIND_MAX_BATCH", "100"))
+# ... or this long after its first document arrived, whichever comes first
+WRITE_BEHIND_MAX_DELAY_MS = float(os.getenv("WRITE_BEHIND_MAX_DELAY_MS", "5"))
+
+
+class WriteBuffer:
+    """
+    Coalesces inserts per collection into unordered insert_many batches.
+
+    Each collection has its own buffer, flushed when it reaches ``max_batch``
+    documents or ``max_delay_ms`` after its first document, and on ``close()``.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = WRITE_BEHIND_ENABLED,
+        mode: str = WRITE_BEHIND_MODE,
+        max_batch: int = WRITE_BEHIND_MAX_BATCH,
+        max_delay_ms: float = WRITE_BEHIND_MAX_DELAY_MS,
+    ):
+        if mode not in ("ack", "fire_and_forget"):
+            raise ValueError(f"Unknown write-behind mode: {mode}")
+        self.enabled = enabled
+        self.mode = mode
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay_ms / 1000
+        self._pending: Dict[str, Tuple[object, List[Tuple[Dict, Optional[asyncio.Future]]]]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._flushes: Set[asyncio.Task] = set()
+        self.documents = 0
+        self.batches = 0
+        self.failed_documents = 0
+        self.max_batch_seen = 0
+        self.flush_ms_total = 0.0
+        self.flush_ms_max = 0.0
+
+    async def insert(self, collection, doc: Dict, wait: Optional[bool] = None):
+        """
+        Insert ``doc`` into ``collection`` through the buffer.
+
+        ``wait`` overrides the durability mode for this call: True waits for
+        the batch write and raises its error (e.g. DuplicateKeyError) for this
+        document, False returns as soon as the document is buffered.
+        """
+        if not self.enabled:
+            await collection.insert_one(doc)
+            return
+        wait = self.mode == "ack" if wait is None else wait
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future() if wait else None
+        name = collection.full_name
+        _, docs = self._pending.setdefault(name, (collection, []))
+        docs.append((doc, future))
+
+        if len(docs) >= self.max_batch:
+            self._start_flush(name)
+        elif name not in self._timers:
+            self._timers[name] = loop.call_later(self.max_delay, self._start_flush, name)
+
+        if future is not None:
+            await future
+
+    def _start_flush(self, name: str):
+        timer = self._timers.pop(name, None)
+        if timer is not None:
+            timer.cancel()
+        pending = self._pending.pop(name, None)
+        if not pending:
+            return
+        task = asyncio.get_running_loop().create_task(self._flush(*pending))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, collection, entries: List[Tuple[Dict, Optional[asyncio.Future]]]):
+        started = time.perf_counter()
+        errors: Dict[int, Exception] = {}
+        try:
+            await collection.insert_many([doc for doc, _ in entries], ordered=False)
+        except BulkWriteError as e:
+            # Unordered: every document without an error here was written
+            for error in e.details.get("writeErrors", []):
+                error_type = DuplicateKeyError if error.get("code") == 11000 else OperationFailure
+                errors[error["index"]] = error_type(error.get("errmsg", "write failed"), error.get("code"), error)
+        except PyMongoError as e:
+            errors = {index: e for index in range(len(entries))}
+        except Exception as e:
+            # Anything else (e.g. a document BSON cannot encode) fails the whole
+            # batch too; its waiters must still get an answer
+            logger.error(f"Write-behind flush of {collection.name} failed: {str(e)}")
+            errors = {index: e for index in range(len(entries))}
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.batches += 1
+        self.documents += len(entries)
+        self.failed_documents += len(errors)
+        self.max_batch_seen = max(self.max_batch_seen, len(entries))
+        self.flush_ms_total += elapsed_ms
+        self.flush_ms_max = max(self.flush_ms_max, elapsed_ms)
+
+        unacknowledged = 0
+        for index, (_, future) in enumerate(entries):
+            error = errors.get(index)
+            if future is None:
+                unacknowledged += error is not None
+            elif not future.done():
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+        if unacknowledged:
+            first = next(iter(errors.values()))
+            logger.error(
+                f"Write-behind lost {unacknowledged} {collection.name} documents: {str(first)}"
+            )
+
+    async def flush(self):
+        """Write every buffered document now and wait for all flushes to finish"""
+        for name in list(self._pending):
+            self._start_flush(name)
+        if self._flushes:
+            await asyncio.gather(*list(self._flushes), return_exceptions=True)
+
+    async def close(self):
+        await self.flush()
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "mode": self.mode,
+            "buffered": sum(len(docs) for _, docs in self._pending.values()),
+            "documents": self.documents,
+            "failed_documents": self.failed_documents,
+            "batches": self.batches,
+            "mean_batch_size": round(self.documents / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "mean_flush_ms": round(self.flush_ms_total / self.batches, 2) if self.batches else 0.0,
+            "max_flush_ms": round(self.flush_ms_max, 2),
+        }
+
+
+write_buffer = WriteBuffer()
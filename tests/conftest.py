@@ -0,0 +1,11 @@
+import os
+import sys
+
+# The backend is a flat set of modules run from backend/, not an installed package
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+sys.path.insert(0, BACKEND_DIR)
+
+# Read when the server is imported: analyze sentiment on threads rather than in a
+# spawned process pool, and leave the stored data alone
+os.environ.setdefault("SENTIMENT_EXECUTOR", "thread")
+os.environ.setdefault("TIMESTAMP_MIGRATION_ON_STARTUP", "false")
@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import ServerSelectionTimeoutError
+
+import llm_client
+import server
+
+USER = {"id": "stream-user", "name": "Stream User", "email": "stream@example.com", "age": 14, "emergency_contacts": []}
+
+
+def fake_provider(deltas):
+    """OpenAI-compatible streaming endpoint that sends ``deltas`` and then [DONE]"""
+
+    async def handle(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        body = "".join(
+            "data: " + json.dumps({"choices": [{"delta": {"content": delta}}]}) + "\n\n" for delta in deltas
+        ) + "data: [DONE]\n\n"
+        return httpx.Response(200, content=body.encode(), headers={"content-type": "text/event-stream"})
+
+    return httpx.AsyncClient(base_url="http://llm.test/v1", transport=httpx.MockTransport(handle))
+
+
+@pytest.fixture
+def app(monkeypatch):
+    db = AsyncMongoMockClient()["test_chat_stream"]
+    monkeypatch.setattr(server, "db", db)
+    server.app.dependency_overrides[server.get_current_user] = lambda: USER
+    yield server.app
+    server.app.dependency_overrides.clear()
+    llm_client._client = None
+
+
+def parse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+async def _stream_chat(app, text: str):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        response = await http.post("/api/chat/stream", json={"message": text})
+    assert response.status_code == 200
+    stored = await server.db.chat_history.find({"user_id": USER["id"]}, {"_id": 0}).to_list(None)
+    return parse_events(response.text), stored
+
+
+def test_streams_tokens_and_stores_the_reply(app):
+    llm_client._client = fake_provider(["That sounds ", "hard. ", "Tell me more?"])
+    events, stored = asyncio.run(_stream_chat(app, "I had a rough day"))
+
+    assert [name for name, _ in events] == ["token", "token", "token", "done"]
+    done = events[-1][1]
+    assert done["response"] == "That sounds hard. Tell me more?"
+    assert [doc["response"] for doc in stored] == [done["response"]]
+
+
+def test_empty_reply_falls_back(app):
+    llm_client._client = fake_provider([])
+    events, stored = asyncio.run(_stream_chat(app, "I had a rough day"))
+
+    assert [name for name, _ in events] == ["token", "done"]
+    fallback = events[0][1]["text"]
+    assert "technical difficulties" in fallback
+    assert events[1][1]["response"] == fallback
+    assert [doc["response"] for doc in stored] == [fallback]
+
+
+def test_history_lookup_failure_falls_back(app, monkeypatch):
+    async def broken_history(*args, **kwargs):
+        raise ServerSelectionTimeoutError("no primary")
+
+    monkeypatch.setattr(server, "build_chat_messages", broken_history)
+    llm_client._client = fake_provider(["never sent"])
+    events, stored = asyncio.run(_stream_chat(app, "I had a rough day"))
+
+    assert [name for name, _ in events] == ["token", "done"]
+    assert "technical difficulties" in events[1][1]["response"]
+    assert len(stored) == 1
@@ -0,0 +1,66 @@
+"""
+Explain-plan check of the hot queries against a real mongod.
+
+Skipped unless one answers at TEST_MONGO_URL (default mongodb://localhost:27017);
+a throwaway database is created and dropped.
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from db_indexes import HOT_QUERIES, ensure_indexes, explain_hot_queries
+
+TEST_MONGO_URL = os.getenv("TEST_MONGO_URL", "mongodb://localhost:27017")
+
+
+def _mongod_reachable() -> bool:
+    try:
+        with MongoClient(TEST_MONGO_URL, serverSelectionTimeoutMS=500) as client:
+            client.admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not _mongod_reachable(), reason=f"no mongod at {TEST_MONGO_URL}")
+
+
+async def _explain_with_data():
+    client = AsyncIOMotorClient(TEST_MONGO_URL, tz_aware=True)
+    db = client[f"test_indexes_{uuid.uuid4().hex[:8]}"]
+    try:
+        report = await ensure_indexes(db)
+        # A few users' rows, so the planner has real candidates to choose between
+        now = datetime.now(timezone.utc)
+        await db.users.insert_many([{"id": f"u{i}", "email": f"u{i}@example.com"} for i in range(20)])
+        for collection in ("mood_entries", "journal_entries", "chat_history", "game_scores"):
+            await db[collection].insert_many([
+                {
+                    "id": f"{collection}-{i}",
+                    "user_id": f"u{i % 20}",
+                    "game_type": "memory" if i % 2 else "puzzle",
+                    "timestamp": now - timedelta(minutes=i),
+                }
+                for i in range(200)
+            ])
+        return report, await explain_hot_queries(db)
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+
+
+def test_hot_queries_use_indexes_without_blocking_sorts():
+    report, plans = asyncio.run(_explain_with_data())
+
+    assert all(result == "ok" for indexes in report.values() for result in indexes.values()), report
+    assert len(plans) == len(HOT_QUERIES)
+    for plan in plans:
+        assert "error" not in plan, plan
+        assert plan["uses_index"], plan
+        assert not plan["blocking_sort"], plan
@@ -0,0 +1,34 @@
+import pytest
+
+from sentiment_analyzer import emotion_keyword_hits, predict_emotion
+
+
+@pytest.mark.parametrize("text, emotion", [
+    ("I am so worried about tomorrow", "anxious"),
+    ("there is only hopelessness left", "sad"),
+    ("a lot of sadness today", "sad"),
+    ("my nervousness before the test", "anxious"),
+    ("I found some calmness at the lake", "calm"),
+    ("I was crying all night", "sad"),
+    ("I keep panicking before exams", "anxious"),
+    ("I panicked in class", "anxious"),
+    ("everyone was so panicky", "anxious"),
+    ("she loved the movie", "happy"),
+    ("I am sad but also happy", "sad"),
+])
+def test_keywords_and_inflections(text, emotion):
+    assert predict_emotion(text, 0.0) == emotion
+
+
+@pytest.mark.parametrize("text", [
+    "I made a crystal model",
+    "my unhappyish cat",
+    "nothing happened",
+])
+def test_partial_words_do_not_match(text):
+    assert predict_emotion(text, 0.0) == "neutral"
+
+
+def test_hits_count_every_match():
+    hits = emotion_keyword_hits("Sad, sadder, SADNESS. Calm and calmly.")
+    assert hits == {"anxious": 0, "sad": 2, "happy": 0, "stressed": 0, "calm": 2}
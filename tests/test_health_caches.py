@@ -0,0 +1,29 @@
+from fastapi.testclient import TestClient
+
+import server
+from sentiment_cache import sentiment_cache
+
+
+def test_sentiment_cache_counters_are_reported():
+    key = sentiment_cache.key_for("test_health_caches: a calm day")
+    before = TestClient(server.app).get("/api/health/caches").json()["sentiment"]
+
+    assert sentiment_cache.get(key) is None
+    sentiment_cache.set(key, {"polarity": 0.3})
+    assert sentiment_cache.get(key) == {"polarity": 0.3}
+
+    after = TestClient(server.app).get("/api/health/caches").json()["sentiment"]
+    assert after["misses"] == before["misses"] + 1
+    assert after["hits"] == before["hits"] + 1
+    assert {"entries", "evictions", "expirations", "shared_hits"} <= after.keys()
+
+
+def test_sentiment_executor_stats_are_reported():
+    stats = TestClient(server.app).get("/api/health/sentiment").json()
+    assert {"kind", "workers", "pending", "completed", "rejected"} <= stats.keys()
+
+
+def test_auth_caches_are_reported():
+    caches = TestClient(server.app).get("/api/health/caches").json()
+    for name in ("tokens", "principals"):
+        assert {"entries", "hits", "misses", "evictions", "expirations"} <= caches[name].keys()
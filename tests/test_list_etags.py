@@ -0,0 +1,105 @@
+import asyncio
+
+import httpx
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import server
+import stats
+from cache_utils import LRUCache
+from write_buffer import WriteBuffer
+
+USER = {"id": "etag-user", "name": "ETag User", "email": "etag@example.com", "age": 14, "emergency_contacts": []}
+GAME = {"game_type": "memory", "score": 42, "duration": 60, "completed": True}
+
+
+@pytest.fixture
+def use_buffer(monkeypatch):
+    def use(mode: str, max_delay_ms: float):
+        buffer = WriteBuffer(enabled=True, mode=mode, max_delay_ms=max_delay_ms)
+        monkeypatch.setattr(server, "write_buffer", buffer)
+        monkeypatch.setattr(stats, "write_buffer", buffer)
+        monkeypatch.setattr(server, "db", AsyncMongoMockClient()[f"test_list_etags_{mode}"])
+        stats.stats_cache.clear()
+        return buffer
+
+    server.app.dependency_overrides[server.get_current_user] = lambda: USER
+    yield use
+    server.app.dependency_overrides.clear()
+
+
+async def _write_then_read(buffer):
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        assert (await http.post("/api/games/scores", json=GAME)).status_code == 200
+        first = await http.get("/api/games/scores")
+        await buffer.flush()
+        second = await http.get("/api/games/scores", headers={"If-None-Match": first.headers.get("ETag", "")})
+    return first, second
+
+
+def test_fire_and_forget_lists_send_no_etag(use_buffer):
+    # A long delay keeps the insert buffered until the test flushes it
+    first, second = asyncio.run(_write_then_read(use_buffer("fire_and_forget", 60_000)))
+
+    assert "ETag" not in first.headers
+    # Once flushed the new score is served, never a stale 304
+    assert second.status_code == 200
+    assert [score["score"] for score in second.json()] == [42]
+
+
+def test_acknowledged_lists_keep_etags(use_buffer):
+    first, second = asyncio.run(_write_then_read(use_buffer("ack", 1)))
+
+    assert [score["score"] for score in first.json()] == [42]
+    assert first.headers["ETag"]
+    assert second.status_code == 304
+
+
+@pytest.fixture
+def two_workers(monkeypatch):
+    """Two gunicorn workers sharing one database, each with its own stats caches"""
+    monkeypatch.setattr(server, "db", AsyncMongoMockClient()["test_list_etags_workers"])
+    caches = {
+        name: (LRUCache(max_entries=100, ttl=60), LRUCache(max_entries=100))
+        for name in ("a", "b")
+    }
+
+    def on(name: str):
+        stats_cache, known_rollups = caches[name]
+        monkeypatch.setattr(stats, "stats_cache", stats_cache)
+        monkeypatch.setattr(stats, "known_rollups", known_rollups)
+
+    server.app.dependency_overrides[server.get_current_user] = lambda: USER
+    yield on
+    server.app.dependency_overrides.clear()
+
+
+async def _write_on_other_worker(on, path: str):
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        on("b")
+        first = await http.get(path)
+        on("a")
+        assert (await http.post("/api/games/scores", json=GAME)).status_code == 200
+        on("b")
+        second = await http.get(path, headers={"If-None-Match": first.headers["ETag"]})
+    return first, second
+
+
+def test_write_on_another_worker_invalidates_list_etag(two_workers):
+    first, second = asyncio.run(_write_on_other_worker(two_workers, "/api/games/scores"))
+
+    assert first.json() == []
+    assert second.status_code == 200
+    assert [score["score"] for score in second.json()] == [42]
+    assert second.headers["ETag"] != first.headers["ETag"]
+
+
+def test_write_on_another_worker_invalidates_stats_etag(two_workers):
+    first, second = asyncio.run(_write_on_other_worker(two_workers, "/api/games/stats"))
+
+    assert first.json()["total_games_played"] == 0
+    assert second.status_code == 200
+    # The body is as fresh as the ETag it is sent with
+    assert second.json()["total_games_played"] == 1
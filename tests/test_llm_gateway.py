@@ -0,0 +1,278 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import llm_client
+from llm_client import LLMError
+from llm_gateway import CircuitBreaker, LLMGateway, LLMUnavailable
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def reply(text: str) -> httpx.Response:
+    return httpx.Response(200, json={"choices": [{"message": {"content": text}}]})
+
+
+def sse(*deltas: str) -> bytes:
+    return "".join(
+        "data: " + json.dumps({"choices": [{"delta": {"content": delta}}]}) + "\n\n" for delta in deltas
+    ).encode()
+
+
+@pytest.fixture
+def provider():
+    """Points llm_client at a MockTransport; tests set ``provider.handle`` and read ``provider.calls``"""
+
+    class Provider:
+        calls = 0
+
+        async def handle(self, request):
+            return reply("ok")
+
+    fake = Provider()
+
+    async def dispatch(request: httpx.Request) -> httpx.Response:
+        fake.calls += 1
+        return await fake.handle(request)
+
+    llm_client._client = httpx.AsyncClient(base_url="http://llm.test/v1", transport=httpx.MockTransport(dispatch))
+    yield fake
+    llm_client._client = None
+
+
+# ============= CIRCUIT BREAKER =============
+
+async def _open_breaker(gateway, provider):
+    async def fail(request):
+        return httpx.Response(500)
+    provider.handle = fail
+    for _ in range(4):
+        with pytest.raises(LLMError):
+            await gateway.complete("user", MESSAGES)
+
+
+def test_breaker_opens_then_closes_after_a_good_trial(provider):
+    async def scenario():
+        gateway = LLMGateway(breaker=CircuitBreaker(window=60, min_calls=4, error_rate=0.5, cooldown=0.05))
+        await _open_breaker(gateway, provider)
+        assert gateway.breaker.state == "open"
+
+        # Open: fails fast without calling the model
+        with pytest.raises(LLMUnavailable):
+            await gateway.complete("user", MESSAGES)
+        assert provider.calls == 4
+        assert gateway.short_circuited == 1
+
+        await asyncio.sleep(0.06)
+        assert gateway.breaker.state == "half-open"
+
+        async def succeed(request):
+            return reply("back")
+        provider.handle = succeed
+        assert await gateway.complete("user", MESSAGES) == "back"
+        assert gateway.breaker.state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_breaker_reopens_after_a_failed_trial(provider):
+    async def scenario():
+        gateway = LLMGateway(breaker=CircuitBreaker(window=60, min_calls=4, error_rate=0.5, cooldown=0.05))
+        await _open_breaker(gateway, provider)
+        await asyncio.sleep(0.06)
+
+        with pytest.raises(LLMError):
+            await gateway.complete("user", MESSAGES)
+        assert gateway.breaker.state == "open"
+        assert provider.calls == 5
+
+    asyncio.run(scenario())
+
+
+def test_half_open_breaker_lets_one_trial_through(provider):
+    async def scenario():
+        gateway = LLMGateway(breaker=CircuitBreaker(window=60, min_calls=4, error_rate=0.5, cooldown=0.05))
+        await _open_breaker(gateway, provider)
+        await asyncio.sleep(0.06)
+
+        release = asyncio.Event()
+
+        async def slow(request):
+            await release.wait()
+            return reply("trial")
+        provider.handle = slow
+        trial = asyncio.create_task(gateway.complete("a", MESSAGES))
+        await asyncio.sleep(0.01)
+        with pytest.raises(LLMUnavailable):
+            await gateway.complete("b", MESSAGES)
+        release.set()
+        assert await trial == "trial"
+        assert gateway.breaker.state == "closed"
+
+    asyncio.run(scenario())
+
+
+# ============= SLOTS =============
+
+async def _hold_slot(gateway, provider, user_id: str):
+    """Start a call that stays in flight until the returned event is set"""
+    release, received = asyncio.Event(), asyncio.Event()
+
+    async def blocked(request):
+        received.set()
+        await release.wait()
+        return reply("done")
+    provider.handle = blocked
+    call = asyncio.create_task(gateway.complete(user_id, MESSAGES))
+    await received.wait()
+    return call, release
+
+
+def test_per_user_limit(provider):
+    async def scenario():
+        gateway = LLMGateway(max_concurrency=10, max_per_user=1, queue_timeout=0.05)
+        call, release = await _hold_slot(gateway, provider, "busy")
+
+        with pytest.raises(LLMUnavailable, match="for this user"):
+            await gateway.complete("busy", MESSAGES)
+        # Other users are not held up
+        other = asyncio.create_task(gateway.complete("other", MESSAGES))
+        await asyncio.sleep(0.01)
+        release.set()
+        assert await call == "done"
+        assert await other == "done"
+        assert gateway.rejected == 1
+        assert gateway.in_flight == 0
+        assert gateway._user_slots == {}
+
+    asyncio.run(scenario())
+
+
+def test_global_limit(provider):
+    async def scenario():
+        gateway = LLMGateway(max_concurrency=1, max_per_user=5, queue_timeout=0.05)
+        call, release = await _hold_slot(gateway, provider, "first")
+
+        with pytest.raises(LLMUnavailable, match="in flight"):
+            await gateway.complete("second", MESSAGES)
+        release.set()
+        assert await call == "done"
+        # The slot is free again
+        assert await gateway.complete("second", MESSAGES) == "done"
+        assert gateway.rejected == 1
+        assert gateway._user_slots == {}
+
+    asyncio.run(scenario())
+
+
+def test_queued_call_gets_the_slot_when_freed(provider):
+    async def scenario():
+        gateway = LLMGateway(max_concurrency=1, max_per_user=5, queue_timeout=1)
+        call, release = await _hold_slot(gateway, provider, "first")
+        queued = asyncio.create_task(gateway.complete("second", MESSAGES))
+        await asyncio.sleep(0.01)
+        assert not queued.done()
+        release.set()
+        assert await call == "done"
+        assert await queued == "done"
+        assert gateway.rejected == 0
+
+    asyncio.run(scenario())
+
+
+# ============= DEADLINES =============
+
+def test_complete_deadline(provider):
+    async def slow(request):
+        await asyncio.sleep(1)
+        return reply("late")
+    provider.handle = slow
+
+    async def scenario():
+        gateway = LLMGateway()
+        with pytest.raises(LLMUnavailable, match="longer than"):
+            await gateway.complete("user", MESSAGES, deadline=0.05)
+        assert gateway.timed_out == 1
+        assert gateway.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+async def _collect(gateway, **deadlines):
+    tokens = []
+    try:
+        async for token in gateway.stream("user", MESSAGES, **deadlines):
+            tokens.append(token)
+    except LLMUnavailable as e:
+        return tokens, str(e)
+    return tokens, None
+
+
+def test_stream_first_token_deadline(provider):
+    async def slow_start(request):
+        await asyncio.sleep(1)
+        return httpx.Response(200, content=sse("late"))
+    provider.handle = slow_start
+
+    async def scenario():
+        gateway = LLMGateway()
+        tokens, error = await _collect(gateway, first_token_deadline=0.05, deadline=5)
+        assert tokens == []
+        assert error.startswith("First LLM token")
+        assert gateway.timed_out == 1
+
+    asyncio.run(scenario())
+
+
+def test_stream_whole_deadline(provider):
+    async def body():
+        yield sse("quick ")
+        await asyncio.sleep(1)
+        yield sse("slow")
+
+    async def stalls(request):
+        return httpx.Response(200, content=body())
+    provider.handle = stalls
+
+    async def scenario():
+        gateway = LLMGateway()
+        tokens, error = await _collect(gateway, first_token_deadline=5, deadline=0.1)
+        assert tokens == ["quick "]
+        assert error.startswith("LLM stream")
+        assert gateway.timed_out == 1
+        assert gateway.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_stream_within_deadlines(provider):
+    async def fine(request):
+        return httpx.Response(200, content=sse("all ", "good") + b"data: [DONE]\n\n")
+    provider.handle = fine
+
+    async def scenario():
+        gateway = LLMGateway()
+        tokens, error = await _collect(gateway, first_token_deadline=1, deadline=1)
+        assert (tokens, error) == (["all ", "good"], None)
+        assert gateway.succeeded == 1
+
+    asyncio.run(scenario())
+
+
+# ============= CONFIGURATION =============
+
+def test_emergent_key_requires_a_base_url(monkeypatch):
+    monkeypatch.setattr(llm_client, "_client", None)
+    monkeypatch.delenv("LLM_API_KEY", raising=False)
+    monkeypatch.delenv("LLM_BASE_URL", raising=False)
+    monkeypatch.setenv("EMERGENT_LLM_KEY", "sk-emergent-test")
+    with pytest.raises(LLMError, match="LLM_BASE_URL"):
+        llm_client.get_client()
+
+    monkeypatch.setenv("LLM_BASE_URL", "http://proxy.test/v1/")
+    client = llm_client.get_client()
+    assert str(client.base_url) == "http://proxy.test/v1/"
+    assert client.headers["Authorization"] == "Bearer sk-emergent-test"
+    monkeypatch.setattr(llm_client, "_client", None)
@@ -0,0 +1,46 @@
+import asyncio
+import types
+
+import pytest
+
+import chat_context
+from readiness import Readiness
+
+
+async def _warm_up(readiness):
+    readiness.start()
+    await asyncio.gather(*readiness._tasks)
+    return readiness.summary()
+
+
+def test_failed_optional_step_is_degraded_not_retried():
+    attempts = []
+
+    async def fails():
+        attempts.append(1)
+        raise RuntimeError("no network")
+
+    async def works():
+        pass
+
+    readiness = Readiness(retry_delay=0.01)
+    readiness.add_step("tokenizer", fails, optional=True)
+    readiness.add_step("mongo", works)
+    summary = asyncio.run(_warm_up(readiness))
+
+    assert summary["ready"] is True
+    assert summary["degraded"] == ["tokenizer"]
+    assert summary["steps"]["tokenizer"] == {"status": "degraded", "attempts": 1, "error": "no network"}
+    assert summary["steps"]["mongo"]["status"] == "done"
+    assert len(attempts) == 1
+
+
+def test_token_count_falls_back_when_the_encoding_cannot_load(monkeypatch):
+    def download_fails(model):
+        raise OSError("BPE download failed")
+
+    monkeypatch.setattr(chat_context, "tiktoken", types.SimpleNamespace(encoding_for_model=download_fails))
+    monkeypatch.setattr(chat_context, "_encoding", None)
+    with pytest.raises(OSError):
+        chat_context.load_encoding()
+    assert chat_context.count_tokens("12345678") == 2
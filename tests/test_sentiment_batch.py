@@ -0,0 +1,26 @@
+import pytest
+
+from sentiment_analyzer import analyze_sentiment, analyze_sentiment_batch
+
+TEXTS = [
+    "I had a really good day at school!",
+    "I am not happy and I feel very lonely",
+    "It was not very bad, really not good either",
+    "Nothing special happened today.",
+    "<3",
+    "I love you <3",
+    "i miss him :(",
+    "great, another test tomorrow (!)",
+    "",
+]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_batch_matches_single_text_analysis(text):
+    assert analyze_sentiment_batch([text]) == [analyze_sentiment(text)]
+
+
+def test_batch_keeps_order_and_flags_concerning_notes():
+    results = analyze_sentiment_batch(TEXTS)
+    assert results == [analyze_sentiment(text) for text in TEXTS]
+    assert results[TEXTS.index("i miss him :(")]["needs_attention"] is True
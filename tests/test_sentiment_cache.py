@@ -0,0 +1,21 @@
+import asyncio
+
+from sentiment_analyzer import analyze_sentiment
+from sentiment_cache import sentiment_cache_key
+from sentiment_executor import analyze_sentiment_async
+
+
+def test_whitespace_is_normalized_but_case_is_kept():
+    assert sentiment_cache_key("good  day\n") == sentiment_cache_key("good day")
+    assert sentiment_cache_key(":D") != sentiment_cache_key(":d")
+    assert sentiment_cache_key("I am happy :D") != sentiment_cache_key("I am happy :d")
+
+
+def test_texts_differing_in_case_get_their_own_scores():
+    async def score(texts):
+        return [await analyze_sentiment_async(text) for text in texts]
+
+    texts = [":D", ":d", "I am happy :D", "I am happy :d"]
+    results = asyncio.run(score(texts))
+    assert [result["polarity"] for result in results] == [1.0, 0.0, 0.9, 0.8]
+    assert results == [analyze_sentiment(text) for text in texts]
@@ -0,0 +1,31 @@
+import asyncio
+import signal
+
+from sentiment_analyzer import analyze_sentiment
+from sentiment_executor import SentimentExecutor
+
+
+def _handler(signum, frame):
+    pass
+
+
+async def _analyze(executor):
+    await executor.wait_warm()
+    result = await executor.run(analyze_sentiment, "I feel happy and calm today")
+    child_handler = await executor.run(signal.getsignal, signal.SIGTERM)
+    return result, child_handler
+
+
+def test_forked_pool_started_before_the_event_loop():
+    # As in gunicorn's post_fork: no event loop yet, and the parent has its own TERM handler
+    previous = signal.signal(signal.SIGTERM, _handler)
+    executor = SentimentExecutor(kind="process", workers=1, start_method="fork")
+    try:
+        executor.start()
+        result, child_handler = asyncio.run(_analyze(executor))
+    finally:
+        executor.shutdown()
+        signal.signal(signal.SIGTERM, previous)
+
+    assert result == analyze_sentiment("I feel happy and calm today")
+    assert child_handler == signal.SIG_DFL
@@ -0,0 +1,146 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import stats
+from write_buffer import WriteBuffer
+
+
+@pytest.fixture
+def fire_and_forget(monkeypatch):
+    # A long delay keeps documents buffered until something flushes them
+    buffer = WriteBuffer(enabled=True, mode="fire_and_forget", max_delay_ms=60_000)
+    monkeypatch.setattr(stats, "write_buffer", buffer)
+    stats.stats_cache.clear()
+    stats.known_rollups.clear()
+    return buffer
+
+
+def _game(user_id: str, i: int):
+    return {
+        "id": f"game-{i}", "user_id": user_id, "game_type": "memory", "score": 10,
+        "duration": 30, "completed": True, "timestamp": datetime.now(timezone.utc),
+    }
+
+
+def _mood(user_id: str, i: int):
+    return {
+        "id": f"mood-{i}", "user_id": user_id, "mood": "calm", "intensity": 6,
+        "sentiment": {"polarity": 0.4}, "timestamp": datetime.now(timezone.utc),
+    }
+
+
+async def _record_buffered(buffer, db, user_id: str):
+    for i in range(3):
+        game = _game(user_id, i)
+        await buffer.insert(db.game_scores, game)
+        await stats.record_game(db, user_id, game)
+        mood = _mood(user_id, i)
+        await buffer.insert(db.mood_entries, mood)
+        await stats.record_mood(db, user_id, mood)
+    await buffer.flush()
+    rollup = await stats.get_user_stats(db, user_id)
+    rebuilt = await stats.rebuild_user_stats(db, user_id)
+    return rollup, rebuilt
+
+
+def test_first_buffered_write_is_counted(fire_and_forget):
+    db = AsyncMongoMockClient()["test_stats_rollups"]
+    rollup, rebuilt = asyncio.run(_record_buffered(fire_and_forget, db, "new-user"))
+
+    assert stats.rollup_game_stats(rollup)["total_games_played"] == 3
+    assert stats.rollup_mood_stats(rollup)["total_entries"] == 3
+    # The incrementally maintained rollup agrees with one rebuilt from scratch
+    assert stats.rollup_game_stats(rollup) == stats.rollup_game_stats(rebuilt)
+    assert stats.rollup_mood_stats(rollup) == stats.rollup_mood_stats(rebuilt)
+
+
+
+class _GatedCollection:
+    """Holds find_one_and_update until the test opens the gate"""
+
+    def __init__(self, collection, reached, gate):
+        self._collection = collection
+        self._reached = reached
+        self._gate = gate
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    async def find_one_and_update(self, *args, **kwargs):
+        self._reached.set()
+        await self._gate.wait()
+        return await self._collection.find_one_and_update(*args, **kwargs)
+
+
+class _GatedDB:
+    def __init__(self, db, reached, gate):
+        self._db = db
+        self._reached = reached
+        self._gate = gate
+
+    def __getitem__(self, name):
+        if name == stats.USER_STATS:
+            return _GatedCollection(self._db[name], self._reached, self._gate)
+        return self._db[name]
+
+    __getattr__ = __getitem__
+
+
+async def _read_between_insert_and_record(db, user_id: str):
+    inserted, read_done = asyncio.Event(), asyncio.Event()
+
+    async def write():
+        game = _game(user_id, 0)
+        await stats.ensure_user_stats(db, user_id)
+        await db.game_scores.insert_one(game)
+        inserted.set()
+        await read_done.wait()
+        await stats.record_game(db, user_id, game)
+
+    async def read():
+        await inserted.wait()
+        stats.stats_cache.clear()
+        await stats.get_user_stats(db, user_id)
+        read_done.set()
+
+    await asyncio.gather(write(), read())
+    stats.stats_cache.clear()
+    return await stats.get_user_stats(db, user_id)
+
+
+def test_first_rollup_read_mid_write_counts_it_once(fire_and_forget):
+    db = AsyncMongoMockClient()["test_stats_race_mid_write"]
+    rollup = asyncio.run(_read_between_insert_and_record(db, "racing-user"))
+
+    assert stats.rollup_game_stats(rollup)["total_games_played"] == 1
+
+
+async def _stale_first_rollup_lands_late(db, user_id: str):
+    reached, gate = asyncio.Event(), asyncio.Event()
+
+    async def slow_read():
+        # Snapshots the empty history, then stalls before storing it
+        await stats.get_user_stats(_GatedDB(db, reached, gate), user_id)
+
+    async def write():
+        await reached.wait()
+        stats.known_rollups.clear()
+        game = _game(user_id, 0)
+        await stats.ensure_user_stats(db, user_id)
+        await db.game_scores.insert_one(game)
+        await stats.record_game(db, user_id, game)
+        gate.set()
+
+    await asyncio.gather(slow_read(), write())
+    stats.stats_cache.clear()
+    return await stats.get_user_stats(db, user_id)
+
+
+def test_stale_first_rollup_does_not_overwrite(fire_and_forget):
+    db = AsyncMongoMockClient()["test_stats_race_stale"]
+    rollup = asyncio.run(_stale_first_rollup_lands_late(db, "racing-user"))
+
+    assert stats.rollup_game_stats(rollup)["total_games_played"] == 1
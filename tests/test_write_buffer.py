@@ -0,0 +1,45 @@
+import asyncio
+
+from bson.errors import InvalidDocument
+
+from write_buffer import WriteBuffer
+
+
+class UnencodableCollection:
+    """insert_many fails the way the driver does on a document BSON cannot encode"""
+
+    name = "mood_entries"
+    full_name = "test.mood_entries"
+
+    async def insert_many(self, docs, ordered=True):
+        raise InvalidDocument("cannot encode object: {1, 2}")
+
+
+async def _insert_both(buffer, collection):
+    return await asyncio.wait_for(
+        asyncio.gather(
+            buffer.insert(collection, {"id": "a", "tags": {1, 2}}),
+            buffer.insert(collection, {"id": "b"}),
+            return_exceptions=True,
+        ),
+        timeout=1,
+    )
+
+
+def test_unexpected_flush_error_reaches_every_waiter():
+    buffer = WriteBuffer(enabled=True, mode="ack", max_batch=2, max_delay_ms=60_000)
+    results = asyncio.run(_insert_both(buffer, UnencodableCollection()))
+
+    assert all(isinstance(result, InvalidDocument) for result in results)
+    assert buffer.failed_documents == 2
+
+
+def test_unexpected_flush_error_is_counted_in_fire_and_forget():
+    async def scenario():
+        buffer = WriteBuffer(enabled=True, mode="fire_and_forget", max_delay_ms=60_000)
+        await buffer.insert(UnencodableCollection(), {"id": "a"})
+        await buffer.flush()
+        return buffer
+
+    buffer = asyncio.run(scenario())
+    assert buffer.failed_documents == 1